@@ -4,120 +4,2218 @@ import sys
 import os
 import re
 import uuid
+import ast
+import json
+import hashlib
+import importlib.util
+import importlib.metadata
+import mmap
+import pstats
+import signal
+import textwrap
+import codecs
+import functools
+import bisect
 import keyword
+import time
+import statistics
+import traceback
+import warnings
 import datetime
 import tempfile
 import subprocess
+import threading
+import queue
+import weakref
+import multiprocessing
+import concurrent.futures
+from array import array
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPlainTextEdit, QTextEdit, QSplitter,
     QVBoxLayout, QHBoxLayout, QTabWidget, QLabel, QLineEdit, QPushButton,
-    QCheckBox, QStatusBar, QToolBar, QFileDialog, QMessageBox, QMenu
+    QCheckBox, QStatusBar, QToolBar, QFileDialog, QMessageBox, QMenu,
+    QDockWidget, QListWidget, QListWidgetItem, QInputDialog, QTableWidget,
+    QTableWidgetItem, QHeaderView, QAbstractItemView, QToolTip
 )
 from PyQt6.QtGui import (
-    QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QPainter,
+    QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat, QColor, QFont, QPainter,
     QTextCursor, QPalette, QKeySequence, QAction
 )
 from PyQt6.QtCore import (
-    Qt, QRegularExpression, QSize, QRect, QTimer, QPoint
+    Qt, QObject, QSize, QRect, QTimer, QPoint, pyqtSignal,
+    QProcess, QProcessEnvironment, QEvent
 )
 
 # ============= تبويب محرر متقدم (الكود الجديد المدمج) 3944 =============
+# ماسح واحد يقرأ السطر مرة واحدة ويعيد أنواع الرموز (token kinds)
+_TOKEN_RE = re.compile(
+    r'(?P<comment>#.*)'
+    r'|(?P<triple>(?:[rRbBuUfF]{1,2})?(?:"""|\'\'\'))'
+    r'|(?P<string>(?:[rRbBuUfF]{1,2})?(?:"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\'))'
+    r'|(?P<number>\b[0-9]+(?:\.[0-9]+)?\b)'
+    r'|(?P<name>[^\W\d]\w*)'
+    r'|(?P<open>[(\[{])'
+    r'|(?P<close>[)\]}])'
+)
+_TRIPLE_END_RE = {
+    '"""': re.compile(r'(?:[^\\]|\\.)*?"""', re.S),
+    "'''": re.compile(r"(?:[^\\]|\\.)*?'''", re.S),
+}
+# حالة نهاية السطر عدد صحيح يصف سياق المحلل بدقة: بتّان لنوع الاقتباس الثلاثي
+# المفتوح (1 """، 2 ''')، بت لسلسلة f، والباقي لعمق الأقواس المفتوحة.
+# التتالي في QSyntaxHighlighter يتوقف عند أول كتلة لم تتغير حالتها.
+_QUOTE_MASK = 0b11
+_FSTRING_FLAG = 0b100
+_DEPTH_SHIFT = 3
+MAX_BRACKET_DEPTH = 255
+_TRIPLE_STATES = {'"""': 1, "'''": 2}
+_STATE_TRIPLES = {1: '"""', 2: "'''"}
+# سطر يبدأ بـ def/class لا يقع داخل أقواس في كود صحيح، فيُعاد ضبط العمق عنده
+# كي لا يمتد أثر قوس غير مغلق إلى نهاية الملف
+_RESYNC_RE = re.compile(r'\s*(?:async\s+)?(?:def|class)\b')
+_WORD_KINDS = dict.fromkeys(keyword.kwlist, 'keyword')
+_WORD_KINDS['self'] = 'self'
+_DEFINITION_KEYWORDS = ('def', 'class')
+# مواضع Qt بوحدات UTF-16، فالأحرف خارج BMP (مثل الإيموجي) تأخذ وحدتين
+_ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+
+# التلوين الكسول للملفات الكبيرة: منطقة العرض أولاً ثم الباقي على دفعات وقت الخمول
+LAZY_HIGHLIGHT_MIN_BLOCKS = 5000
+LAZY_HIGHLIGHT_MARGIN = 50
+LAZY_HIGHLIGHT_CHUNK = 200
+LAZY_HIGHLIGHT_SLICE = 0.008
+_PENDING_STATE = -1
+# فوق هذا الحد يُحلَّل المستند في عملية منفصلة ويطبّق الخيط الرئيسي النتائج فقط
+OFFTHREAD_TOKENIZE_MIN_BLOCKS = 20000
+# نتيجة العامل التي سبقها تعديل تُستعمل لما قبله فقط؛ بعد هذا العدد لا يُعاد الإرسال
+# ويُكمل الخمول الباقي في الخيط الرئيسي
+OFFTHREAD_TOKENIZE_RETRIES = 3
+
+def tokenize_line(text, state=0, brackets=None):
+    """يقسم سطراً واحداً إلى مقاطع (start, length, kind) ويعيد حالة نهاية السطر.
+
+    إذا مُررت قائمة brackets تُضاف إليها الأقواس الواقعة خارج النصوص
+    والتعليقات بالشكل (column, char).
+    """
+    spans, state = _scan_line(text, state, brackets)
+    if (spans or brackets) and not text.isascii():
+        astral = [m.start() for m in _ASTRAL_RE.finditer(text)]
+        if astral:
+            spans = [(start + bisect.bisect_left(astral, start),
+                      length + bisect.bisect_left(astral, start + length) - bisect.bisect_left(astral, start),
+                      kind)
+                     for start, length, kind in spans]
+            if brackets:
+                brackets[:] = [(column + bisect.bisect_left(astral, column), char)
+                               for column, char in brackets]
+    return spans, state
+
+def _scan_line(text, state, brackets):
+    spans = []
+    pos = 0
+    quote = _STATE_TRIPLES.get(state & _QUOTE_MASK)
+    depth = state >> _DEPTH_SHIFT
+    if quote:
+        match = _TRIPLE_END_RE[quote].match(text)
+        if match is None:
+            if text:
+                spans.append((0, len(text), 'string'))
+            return spans, state
+        pos = match.end()
+        spans.append((0, pos, 'string'))
+    elif depth and _RESYNC_RE.match(text):
+        depth = 0
+
+    expect_definition = False
+    search = _TOKEN_RE.search
+    while True:
+        match = search(text, pos)
+        if match is None:
+            return spans, min(depth, MAX_BRACKET_DEPTH) << _DEPTH_SHIFT
+        kind = match.lastgroup
+        start, pos = match.span()
+        if kind == 'name':
+            word = match.group()
+            if expect_definition:
+                spans.append((start, pos - start, 'definition'))
+                expect_definition = False
+                continue
+            word_kind = _WORD_KINDS.get(word)
+            if word_kind:
+                spans.append((start, pos - start, word_kind))
+            expect_definition = word in _DEFINITION_KEYWORDS
+            continue
+        expect_definition = False
+        if kind == 'open':
+            depth += 1
+            if brackets is not None:
+                brackets.append((start, match.group()))
+            continue
+        if kind == 'close':
+            if depth:
+                depth -= 1
+            if brackets is not None:
+                brackets.append((start, match.group()))
+            continue
+        if kind == 'triple':
+            token = match.group()
+            quote = token[-3:]
+            end_match = _TRIPLE_END_RE[quote].match(text, pos)
+            if end_match is None:
+                spans.append((start, len(text) - start, 'string'))
+                state = _TRIPLE_STATES[quote] | (min(depth, MAX_BRACKET_DEPTH) << _DEPTH_SHIFT)
+                if 'f' in token[:-3].lower():
+                    state |= _FSTRING_FLAG
+                return spans, state
+            pos = end_match.end()
+            kind = 'string'
+        spans.append((start, pos - start, kind))
+
+# ألوان أنواع الرموز لكل سمة؛ تبديل السمة يبدّل هذا الجدول فقط دون إعادة التحليل.
+# السمتان بألوان التلوين الأصلية نفسها، كما كانتا قبل فصل الألوان عن التحليل
+_DEFAULT_SYNTAX_COLORS = {
+    'keyword': '#569CD6',
+    'number': '#B5CEA8',
+    'string': '#CE9178',
+    'comment': '#6A9955',
+    'definition': '#DCDCAA',
+    'self': '#9CDCFE',
+}
+SYNTAX_THEMES = {
+    'dark': dict(_DEFAULT_SYNTAX_COLORS),
+    'light': dict(_DEFAULT_SYNTAX_COLORS),
+}
+
+_TOKEN_KINDS = ('keyword', 'number', 'string', 'comment', 'definition', 'self')
+_KIND_CODES = {kind: code for code, kind in enumerate(_TOKEN_KINDS)}
+
+def tokenize_document(text):
+    """يحلل المستند كاملاً ويعيد مصفوفات مدمجة:
+    (offsets, spans, states, bracket_offsets, brackets).
+
+    مقاطع السطر n هي الثلاثيات spans[3*offsets[n]:3*offsets[n+1]]
+    بالشكل (start, length, kind code)، و states[n] حالة نهاية السطر،
+    وأقواسه الأزواج brackets[2*bracket_offsets[n]:2*bracket_offsets[n+1]]
+    بالشكل (column, ord(char)).
+    """
+    offsets = array('I', [0])
+    flat = array('I')
+    states = array('i')
+    bracket_offsets = array('I', [0])
+    bracket_flat = array('I')
+    state = 0
+    codes = _KIND_CODES
+    for line in text.split('\n'):
+        brackets = []
+        spans, state = tokenize_line(line, state, brackets)
+        for start, length, kind in spans:
+            flat.extend((start, length, codes[kind]))
+        for column, char in brackets:
+            bracket_flat.extend((column, ord(char)))
+        offsets.append(len(flat) // 3)
+        states.append(state)
+        bracket_offsets.append(len(bracket_flat) // 2)
+    return offsets, flat, states, bracket_offsets, bracket_flat
+
+# مجمع عمليات واحد لكل الأعمال الثقيلة (التلوين والبحث وتحليل المكتبات)؛ كل عامل
+# يستورد PyQt6 والمحرر عند بدئه فلا يُنشأ إلا مرة، ويُغلق عند خروج التطبيق
+_worker_pool = None
+
+def _get_worker_pool():
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context('spawn'))
+    return _worker_pool
+
+def _shutdown_worker_pool():
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown(wait=False, cancel_futures=True)
+        _worker_pool = None
+    for worker in _isolated_workers.values():
+        worker.shutdown()
+    _isolated_workers.clear()
+
+def _deliver_result(future, signal, *args):
+    # نتيجة العامل -- أو استثناؤه -- تصل إلى الخيط الرئيسي عبر الإشارة: signal(*args, result)
+    def emit(future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        try:
+            signal.emit(*args, result)
+        except RuntimeError:
+            pass  # حُذف المستقبِل (أُغلق لسان التبويب) قبل وصول النتيجة
+    future.add_done_callback(emit)
+
+def _isolated_worker_main(conn):
+    # حلقة العملية المعزولة: (func, args) ← (نجاح؟، النتيجة أو الاستثناء)
+    conn.send(None)
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, e)
+        conn.send(reply)
+
+class _IsolatedWorker:
+    """عملية عاملة واحدة تنفذ المهام بالترتيب، وتُقتل إن تجاوزت مهمة مهلتها.
+
+    مسح التعبير النمطي لا يمكن مقاطعته من داخل finditer، فحده الزمني لا يُضمن
+    إلا بقتل العملية التي تنفذه. submit يعيد concurrent.futures.Future كالمجمع
+    فيصلح مع _deliver_result؛ المهمة المقتولة تنتهي بـ TimeoutError وتُستبدل
+    العملية فوراً. المهلة تُحسب بعد أن تصبح العملية جاهزة لا من لحظة الطلب.
+    """
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        self._thread = None
+        self._process = None
+        self._conn = None
+
+    def submit(self, timeout, func, *args):
+        future = concurrent.futures.Future()
+        self._jobs.put((future, timeout, func, args))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return future
+
+    def start(self):
+        # تبدأ العملية مسبقاً فلا ينتظر أول بحث زمن بدئها
+        return self.submit(None, int)
+
+    def shutdown(self):
+        self._jobs.put(None)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, timeout, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                conn = self._connection()
+                conn.send((func, args))
+                if not conn.poll(timeout):
+                    raise TimeoutError(f"تجاوزت المهمة مهلتها ({timeout:.2f} ث)")
+                ok, result = conn.recv()
+            except Exception as e:
+                self._kill()
+                future.set_exception(e)
+                try:
+                    self._connection()
+                except Exception:
+                    self._kill()
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+        self._kill()
+
+    def _connection(self):
+        if self._process is None:
+            context = multiprocessing.get_context('spawn')
+            self._conn, child = context.Pipe()
+            self._process = context.Process(target=_isolated_worker_main, args=(child,), daemon=True)
+            self._process.start()
+            child.close()
+            self._conn.recv()
+        return self._conn
+
+    def _kill(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+            self._process = self._conn = None
+
+# عملية معزولة لكل غرض: البحث الذي ينتظره المستخدم ('foreground') لا يصطف خلف
+# دفعات البحث في الخلفية ('background')
+_isolated_workers = {}
+
+def _get_isolated_worker(name):
+    worker = _isolated_workers.get(name)
+    if worker is None:
+        worker = _isolated_workers[name] = _IsolatedWorker()
+    return worker
+
+def _make_format(color):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    return fmt
+
+class _BlockSpans(QTextBlockUserData):
+    # مقاطع الكتلة كما أعادها المحلل، لإعادة تلوينها بسمة أخرى دون تحليل
+    def __init__(self, spans, generation):
+        super().__init__()
+        self.spans = spans
+        self.generation = generation
+
 class PythonSyntaxHighlighter(QSyntaxHighlighter):
+    spansReady = pyqtSignal(int, object)
+    # عدد الكتل التي أعيد تحليلها بسبب آخر تعديل (طول التتالي)
+    blocksRelexed = pyqtSignal(int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlightingRules = []
-        self.setupRules()
-
-    def setupRules(self):
-        # تلوين الكلمات المفتاحية
-        keywordFormat = QTextCharFormat()
-        keywordFormat.setForeground(QColor('#569CD6'))
-        keywords = '|'.join(keyword.kwlist)
-        self.highlightingRules.append((QRegularExpression(f'\\b({keywords})\\b'), keywordFormat))
-
-        # تلوين الأرقام
-        numberFormat = QTextCharFormat()
-        numberFormat.setForeground(QColor('#B5CEA8'))
-        self.highlightingRules.append((QRegularExpression('\\b[0-9]+(?:\\.[0-9]+)?\\b'), numberFormat))
-
-        # تلوين النصوص
-        stringFormat = QTextCharFormat()
-        stringFormat.setForeground(QColor('#CE9178'))
-        self.highlightingRules.append((QRegularExpression('"[^"\\\\]*(\\\\.[^"\\\\]*)*"'), stringFormat))
-        self.highlightingRules.append((QRegularExpression("'[^'\\\\]*(\\\\.[^'\\\\]*)*'"), stringFormat))
-        self.highlightingRules.append((QRegularExpression('"""[^"]*"""'), stringFormat))
-        self.highlightingRules.append((QRegularExpression("'''[^']*'''"), stringFormat))
-
-        # تلوين التعليقات
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor('#6A9955'))
-        self.highlightingRules.append((QRegularExpression('#[^\\n]*'), commentFormat))
-
-        # تلوين الدوال والكلاسات
-        functionFormat = QTextCharFormat()
-        functionFormat.setForeground(QColor('#DCDCAA'))
-        self.highlightingRules.append((QRegularExpression('\\bdef\\s+(\\w+)\\s*\\('), functionFormat))
-        self.highlightingRules.append((QRegularExpression('\\bclass\\s+(\\w+)\\s*[:(]'), functionFormat))
-
-        # تلوين self
-        selfFormat = QTextCharFormat()
-        selfFormat.setForeground(QColor('#9CDCFE'))
-        self.highlightingRules.append((QRegularExpression('\\bself\\b'), selfFormat))
+        self.formats = {}
+        self._theme_formats = {}
+        self._theme_generation = 0
+        self._recolouring = False
+        self.setupFormats()
+
+        # None يعني أن كل الكتل تُلوَّن مباشرة (الوضع العادي)
+        self._lazy_frontier = None
+        self._view_first = self._view_last = -1
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.setInterval(0)
+        self._idle_timer.timeout.connect(self._highlightIdleChunk)
+
+        # rehighlightBlock يرفع revision المستند دون تغيير النص، فنطرح ما سببناه نحن
+        self._format_revisions = 0
+        # الحالة تنتقل إلى الأمام فقط، فالكتل قبل أول كتلة عُدّلت بعد اللقطة تبقى نتائجها صالحة
+        self._background_job = None
+        self._job_limit = sys.maxsize
+        self._background_spans = None
+        self._background_limit = 0
+        self._stale_results = 0
+        self.spansReady.connect(self._applyBackgroundSpans)
+        if self.document() is not None:
+            self.document().contentsChange.connect(self._limitBackgroundSpans)
+
+        self.lastRelexCount = 0
+        self._relex_revision = -1
+        self._own_rehighlight = False
+
+        self._bracket_index = None
+
+    def setupFormats(self):
+        self._theme_formats = {
+            name: {kind: _make_format(color) for kind, color in colors.items()}
+            for name, colors in SYNTAX_THEMES.items()
+        }
+        self.formats = self._theme_formats['dark']
+
+    def setTheme(self, name):
+        formats = self._theme_formats[name]
+        if formats is self.formats:
+            return
+        # الكتل الظاهرة يُعاد تلوينها من setVisibleBlocks، والباقي عند ظهوره
+        self.formats = formats
+        self._theme_generation += 1
+        self._view_first = self._view_last = -1
+
+    def isLazy(self):
+        return self._lazy_frontier is not None
+
+    def contentRevision(self):
+        return self.document().revision() - self._format_revisions
+
+    def _rehighlight(self, block):
+        before = self.document().revision()
+        self._format_revisions += 1
+        self._own_rehighlight = True
+        try:
+            self.rehighlightBlock(block)
+        finally:
+            self._own_rehighlight = False
+        self._format_revisions += self.document().revision() - before - 1
+
+    def _countRelexedBlock(self):
+        revision = self.contentRevision()
+        if revision != self._relex_revision:
+            self._relex_revision = revision
+            self.lastRelexCount = 0
+            QTimer.singleShot(0, self._reportRelexCount)
+        self.lastRelexCount += 1
+
+    def _reportRelexCount(self):
+        self.blocksRelexed.emit(self.lastRelexCount)
+
+    def tokenizeInBackground(self):
+        # لقطة من النص تُحلَّل في عملية العامل؛ الكتل الظاهرة تبقى تُلوَّن عند الطلب
+        revision = self.contentRevision()
+        self._background_job = revision
+        self._job_limit = sys.maxsize
+        future = _get_worker_pool().submit(tokenize_document, self.document().toPlainText())
+        _deliver_result(future, self.spansReady, revision)
+
+    def _limitBackgroundSpans(self, position, removed, added):
+        block = self.document().findBlock(position).blockNumber()
+        self._job_limit = min(self._job_limit, block)
+        self._background_limit = min(self._background_limit, block)
+
+    def _applyBackgroundSpans(self, revision, result):
+        if self._background_job != revision:
+            return
+        self._background_job = None
+        if self._lazy_frontier is None:
+            return
+        if not isinstance(result, Exception):
+            states = result[2]
+            self._background_spans = result
+            self._background_limit = min(self._job_limit, len(states))
+            if self._background_limit < len(states):
+                self._stale_results += 1
+                if self._stale_results < OFFTHREAD_TOKENIZE_RETRIES:
+                    self.tokenizeInBackground()
+        self._idle_timer.start()
+
+    def setBracketIndex(self, index):
+        # كل كتلة يُعاد تحليلها تُبلغ الفهرس بأقواسها
+        self._bracket_index = index
+        index.complete = self._lazy_frontier is None
+
+    def beginLazyHighlighting(self):
+        # يُستدعى قبل setPlainText: الكتل خارج منطقة العرض تبقى معلّقة
+        # وتُكمَل لاحقاً من حلقة الأحداث عند الخمول
+        if self._bracket_index is not None:
+            self._bracket_index.complete = False
+        self._stale_results = 0
+        self._lazy_frontier = QTextCursor(self.document())
+        self._lazy_frontier.setKeepPositionOnInsert(True)
+        self._view_first = self._view_last = -1
+        self._idle_timer.start()
+
+    def setVisibleBlocks(self, first, last):
+        first = max(0, first - LAZY_HIGHLIGHT_MARGIN)
+        last = last + LAZY_HIGHLIGHT_MARGIN
+        if (first, last) == (self._view_first, self._view_last):
+            return
+        self._view_first, self._view_last = first, last
+        generation = self._theme_generation
+        block = self.document().findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            if block.userState() == _PENDING_STATE:
+                self._rehighlight(block)
+            else:
+                data = block.userData()
+                if data is not None and data.generation != generation:
+                    self._recolourBlock(block)
+            block = block.next()
+
+    def _recolourBlock(self, block):
+        self._recolouring = True
+        try:
+            self._rehighlight(block)
+        finally:
+            self._recolouring = False
+
+    def _highlightIdleChunk(self):
+        # يستمر أثناء عمل العامل؛ ما تصل نتيجته يُطبَّق دون تحليل
+        frontier = self._lazy_frontier
+        if frontier is None:
+            return
+        deadline = time.perf_counter() + LAZY_HIGHLIGHT_SLICE
+        block = frontier.block()
+        while time.perf_counter() < deadline:
+            chunk_end = self.document().findBlockByNumber(block.blockNumber() + LAZY_HIGHLIGHT_CHUNK)
+            if chunk_end.isValid():
+                frontier.setPosition(chunk_end.position())
+            else:
+                self._lazy_frontier = None
+            while block.isValid() and block != chunk_end:
+                if block.userState() == _PENDING_STATE:
+                    self._rehighlight(block)
+                block = block.next()
+            if self._lazy_frontier is None:
+                self._background_spans = None
+                if self._bracket_index is not None:
+                    self._bracket_index.complete = True
+                return
+        self._idle_timer.start()
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            matchIterator = pattern.globalMatch(text)
-            while matchIterator.hasNext():
-                match = matchIterator.next()
-                start = match.capturedStart()
-                length = match.capturedLength()
-                if pattern.pattern() in ('\\bdef\\s+(\\w+)\\s*\\(', '\\bclass\\s+(\\w+)\\s*[:(]'):
-                    start = match.capturedStart(1)
-                    length = match.capturedLength(1)
-                self.setFormat(start, length, format)
-
-        self.setCurrentBlockState(0)
-        startIndex = 0
-        if self.previousBlockState() != 1:
-            startIndex = text.find('"""')
-            if startIndex == -1:
-                startIndex = text.find("'''")
-
-        while startIndex >= 0:
-            endIndexTripleDouble = text.find('"""', startIndex + 3)
-            endIndexTripleSingle = text.find("'''", startIndex + 3)
-
-            if text.startswith('"""', startIndex):
-                quote_len = 3
-                endIndex = endIndexTripleDouble
-            elif text.startswith("'''", startIndex):
-                 quote_len = 3
-                 endIndex = endIndexTripleSingle
+        if self._recolouring:
+            data = self.currentBlockUserData()
+            data.generation = self._theme_generation
+            self._applySpans(data.spans)
+            self.setCurrentBlockState(self.currentBlockState())
+            return
+
+        frontier = self._lazy_frontier
+        if frontier is not None:
+            number = self.currentBlock().blockNumber()
+            if number >= frontier.blockNumber() and not self._view_first <= number <= self._view_last:
+                self.setCurrentBlockState(_PENDING_STATE)
+                return
+            # التحليل الناتج عن تعديل يبدأ من الكتلة المعدلة فلا يُستعمل له ما حُلل قبلها
+            background = self._background_spans
+            if background is not None and self._own_rehighlight and number < self._background_limit:
+                offsets, flat, states, bracket_offsets, bracket_flat = background
+                spans = [(flat[i], flat[i + 1], _TOKEN_KINDS[flat[i + 2]])
+                         for i in range(3 * offsets[number], 3 * offsets[number + 1], 3)]
+                brackets = [(bracket_flat[i], chr(bracket_flat[i + 1]))
+                            for i in range(2 * bracket_offsets[number], 2 * bracket_offsets[number + 1], 2)]
+                self._applySpans(spans)
+                self._reportBrackets(brackets)
+                self.setCurrentBlockUserData(_BlockSpans(spans, self._theme_generation))
+                self.setCurrentBlockState(states[number])
+                return
+
+        if not self._own_rehighlight:
+            self._countRelexedBlock()
+        brackets = [] if self._bracket_index is not None else None
+        spans, state = tokenize_line(text, max(self.previousBlockState(), 0), brackets)
+        self._applySpans(spans)
+        self._reportBrackets(brackets)
+        self.setCurrentBlockUserData(_BlockSpans(spans, self._theme_generation))
+        self.setCurrentBlockState(state)
+
+    def _reportBrackets(self, brackets):
+        if self._bracket_index is None:
+            return
+        block = self.currentBlock()
+        position = block.position()
+        self._bracket_index.setBlockBrackets(position, position + block.length(), brackets)
+
+    def _applySpans(self, spans):
+        formats = self.formats
+        for start, length, kind in spans:
+            self.setFormat(start, length, formats[kind])
+
+# ============= فهارس المواضع (الأقواس ونتائج البحث) =============
+_BRACKET_PARTNERS = {'(': ')', ')': '(', '[': ']', ']': '[', '{': '}', '}': '{'}
+POSITION_CHUNK_SIZE = 256
+
+class _PositionChunk:
+    # جزء مرتب من المواضع مع قيمة لكل موضع، كلاهما مصفوفة array مدمجة؛
+    # shift إزاحة مؤجلة تضاف لكل المواضع
+    __slots__ = ('positions', 'values', 'shift', '_summary')
+
+    def __init__(self, positions, values):
+        self.positions = positions
+        self.values = values
+        self.shift = 0
+        self._summary = None
+
+    def summary(self):
+        # (المجموع، أدنى مجموع بادئة، أعلى مجموع لاحقة) لتخطي الجزء كاملاً عند البحث
+        if self._summary is None:
+            total = low = 0
+            for value in self.values:
+                total += value
+                if total < low:
+                    low = total
+            acc = high = 0
+            for value in reversed(self.values):
+                acc += value
+                if acc > high:
+                    high = acc
+            self._summary = (total, low, high)
+        return self._summary
+
+class _ChunkedPositions:
+    # مواضع مرتبة مقسّمة إلى أجزاء: التعديل يلمس جزءاً واحداً ويزيح ما بعده
+    # بتعديل shift لكل جزء بدلاً من كل موضع
+    _VALUE_TYPECODE = 'q'
+
+    def __init__(self):
+        self.chunks = []
+        self._counts = None
+
+    def __len__(self):
+        counts = self._cumulativeCounts()
+        return counts[-1] if counts else 0
+
+    def _cumulativeCounts(self):
+        if self._counts is None:
+            total = 0
+            counts = []
+            for chunk in self.chunks:
+                total += len(chunk.positions)
+                counts.append(total)
+            self._counts = counts
+        return self._counts
+
+    def item(self, index):
+        counts = self._cumulativeCounts()
+        c = bisect.bisect_right(counts, index)
+        chunk = self.chunks[c]
+        k = index - (counts[c - 1] if c else 0)
+        return chunk.positions[k] + chunk.shift, chunk.values[k]
+
+    def indexAtOrAfter(self, pos):
+        # فهرس أول موضع >= pos (أو len إن لم يوجد)
+        c = self._chunkAtOrAfter(pos)
+        counts = self._cumulativeCounts()
+        if c == len(self.chunks):
+            return counts[-1] if counts else 0
+        chunk = self.chunks[c]
+        return (counts[c - 1] if c else 0) + bisect.bisect_left(chunk.positions, pos - chunk.shift)
+
+    def clear(self):
+        self.chunks = []
+        self._counts = None
+
+    def _chunkAtOrAfter(self, pos):
+        chunks = self.chunks
+        lo, hi = 0, len(chunks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            chunk = chunks[mid]
+            if chunk.positions[-1] + chunk.shift < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def splice(self, start, end, delta, positions=(), values=()):
+        # يحذف المواضع في [start, end)، يزيح ما بعدها بمقدار delta، ويُدرج الجديدة
+        chunks = self.chunks
+        self._counts = None
+        lo = self._chunkAtOrAfter(start)
+        if lo == len(chunks):
+            # كل المواضع الحالية قبل start: إلحاق مباشر، وهي الحالة الشائعة عند التحميل
+            self._append(positions, values)
+            return
+        hi = lo
+        while hi < len(chunks) and chunks[hi].positions[0] + chunks[hi].shift < end:
+            hi += 1
+        if hi == lo:
+            if not positions:
+                if delta:
+                    for chunk in chunks[lo:]:
+                        chunk.shift += delta
+                return
+            if lo < len(chunks):
+                hi = lo + 1
+        if hi == lo + 1 and len(chunks[lo].positions) + len(positions) <= 2 * POSITION_CHUNK_SIZE:
+            # الحالة الشائعة عند الكتابة: التعديل داخل جزء واحد يُطبَّق في مكانه
+            chunk = chunks[lo]
+            shift = chunk.shift
+            a = bisect.bisect_left(chunk.positions, start - shift)
+            b = bisect.bisect_left(chunk.positions, end - shift)
+            tail = chunk.positions[b:]
+            if delta:
+                tail = array('q', [p + delta for p in tail])
+            chunk.positions[a:] = array('q', [p - shift for p in positions] if shift else positions) + tail
+            chunk.values[a:b] = array(self._VALUE_TYPECODE, values)
+            chunk._summary = None
+            if not chunk.positions:
+                del chunks[lo]
+                lo -= 1
+            if delta:
+                for chunk in chunks[lo + 1:]:
+                    chunk.shift += delta
+            return
+        old_positions = array('q')
+        old_values = array(self._VALUE_TYPECODE)
+        for chunk in chunks[lo:hi]:
+            shift = chunk.shift
+            old_positions.extend([p + shift for p in chunk.positions] if shift else chunk.positions)
+            old_values.extend(chunk.values)
+        a = bisect.bisect_left(old_positions, start)
+        b = bisect.bisect_left(old_positions, end)
+        new_positions = old_positions[:a]
+        new_positions.extend(positions)
+        new_positions.extend([p + delta for p in old_positions[b:]] if delta else old_positions[b:])
+        new_values = old_values[:a]
+        new_values.extend(values)
+        new_values.extend(old_values[b:])
+        new_chunks = [_PositionChunk(new_positions[i:i + POSITION_CHUNK_SIZE], new_values[i:i + POSITION_CHUNK_SIZE])
+                      for i in range(0, len(new_positions), POSITION_CHUNK_SIZE)]
+        chunks[lo:hi] = new_chunks
+        if delta:
+            for chunk in chunks[lo + len(new_chunks):]:
+                chunk.shift += delta
+
+    def _append(self, positions, values):
+        chunks = self.chunks
+        self._counts = None
+        i = 0
+        if chunks and positions:
+            last = chunks[-1]
+            i = min(len(positions), POSITION_CHUNK_SIZE - len(last.positions))
+            if i > 0:
+                last.positions.extend([p - last.shift for p in positions[:i]])
+                last.values.extend(values[:i])
+                last._summary = None
             else:
+                i = 0
+        for j in range(i, len(positions), POSITION_CHUNK_SIZE):
+            chunks.append(_PositionChunk(array('q', positions[j:j + POSITION_CHUNK_SIZE]),
+                                         array(self._VALUE_TYPECODE, values[j:j + POSITION_CHUNK_SIZE])))
+
+    def hasRange(self, start, end):
+        index = self._chunkAtOrAfter(start)
+        if index == len(self.chunks):
+            return False
+        chunk = self.chunks[index]
+        k = bisect.bisect_left(chunk.positions, start - chunk.shift)
+        return chunk.positions[k] + chunk.shift < end
+
+class _BracketSequence(_ChunkedPositions):
+    # أقواس نوع واحد: القيمة +1 للفتح و-1 للإغلاق
+    _VALUE_TYPECODE = 'b'
+
+    def match(self, pos):
+        index = self._chunkAtOrAfter(pos)
+        if index == len(self.chunks):
+            return None
+        chunk = self.chunks[index]
+        k = bisect.bisect_left(chunk.positions, pos - chunk.shift)
+        if chunk.positions[k] + chunk.shift != pos:
+            return None
+        if chunk.values[k] > 0:
+            return self._matchForward(index, k)
+        return self._matchBackward(index, k)
+
+    def _matchForward(self, index, k):
+        chunks = self.chunks
+        level = 0
+        chunk = chunks[index]
+        for j in range(k + 1, len(chunk.values)):
+            level += chunk.values[j]
+            if level < 0:
+                return chunk.positions[j] + chunk.shift
+        for chunk in chunks[index + 1:]:
+            total, low, _ = chunk.summary()
+            if level + low >= 0:
+                level += total
+                continue
+            for j, value in enumerate(chunk.values):
+                level += value
+                if level < 0:
+                    return chunk.positions[j] + chunk.shift
+        return None
+
+    def _matchBackward(self, index, k):
+        chunks = self.chunks
+        level = 0
+        chunk = chunks[index]
+        for j in range(k - 1, -1, -1):
+            level += chunk.values[j]
+            if level > 0:
+                return chunk.positions[j] + chunk.shift
+        for i in range(index - 1, -1, -1):
+            chunk = chunks[i]
+            total, _, high = chunk.summary()
+            if level + high <= 0:
+                level += total
+                continue
+            for j in range(len(chunk.values) - 1, -1, -1):
+                level += chunk.values[j]
+                if level > 0:
+                    return chunk.positions[j] + chunk.shift
+        return None
+
+class BracketIndex:
+    """فهرس أقواس المستند خارج النصوص والتعليقات.
+
+    يُحدَّث تدريجياً: contentsChange يحذف أقواس المقطع المحذوف ويزيح ما بعده،
+    ثم يبلغ PythonSyntaxHighlighter عن أقواس كل كتلة يعيد تحليلها.
+    complete تكون False ما دام التلوين الكسول لم يمر على كل الكتل.
+    """
+
+    def __init__(self, document):
+        self.complete = False
+        self._sequences = {'(': _BracketSequence(), '[': _BracketSequence(), '{': _BracketSequence()}
+        # يجب أن يُربط قبل المُلوِّن كي تُطبَّق الإزاحة قبل أن تصل أقواس الكتل الجديدة
+        document.contentsChange.connect(self._onContentsChange)
+
+    def _onContentsChange(self, position, chars_removed, chars_added):
+        # تغيير بطول ثابت (ومنه تحديث التنسيق) لا يزيح شيئاً، والمُلوِّن يبلغ الكتل المعدلة
+        if chars_removed == chars_added:
+            return
+        end = position + chars_removed
+        delta = chars_added - chars_removed
+        for sequence in self._sequences.values():
+            sequence.splice(position, end, delta)
+
+    def setBlockBrackets(self, start, end, brackets):
+        grouped = {}
+        for column, char in brackets:
+            opener = char if char in self._sequences else _BRACKET_PARTNERS[char]
+            positions, values = grouped.setdefault(opener, ([], []))
+            positions.append(start + column)
+            values.append(1 if char == opener else -1)
+        for opener, sequence in self._sequences.items():
+            positions, values = grouped.get(opener, ((), ()))
+            if positions or sequence.hasRange(start, end):
+                sequence.splice(start, end, 0, positions, values)
+
+    def findMatch(self, position, char):
+        opener = char if char in self._sequences else _BRACKET_PARTNERS.get(char)
+        if opener is None:
+            return None
+        return self._sequences[opener].match(position)
+
+def _document_text(document):
+    # مثل toPlainText لكن دون تحويل المسافات غير الفاصلة، فتطابق المواضعُ المحتوى الفعلي
+    return document.toRawText().replace('\u2029', '\n')
+
+def _utf16_offset(text, index):
+    # موضع Qt (UTF-16) المقابل لفهرس بايثون index في text
+    if text.isascii():
+        return index
+    return index + sum(1 for _ in _ASTRAL_RE.finditer(text, 0, index))
+
+def _common_prefix_length(a, b):
+    # بحث ثنائي بمقارنة شرائح (في C) بدل المرور حرفاً حرفاً
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix_length(a, b, limit):
+    lo, hi = 0, min(len(a), len(b), limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def text_difference(old, new):
+    """(start, old_end, new_end): أصغر مقطع يختلف فيه old عن new."""
+    start = _common_prefix_length(old, new)
+    suffix = _common_suffix_length(old, new, min(len(old), len(new)) - start)
+    return start, len(old) - suffix, len(new) - suffix
+
+# تحويلات الأسطر: كل منها يأخذ قائمة أسطر ويعيد قائمة بالطول نفسه
+INDENT_UNIT = '    '
+
+def _uncomment_line(line):
+    stripped = line.lstrip()
+    if not stripped.startswith('#'):
+        return line
+    indent = len(line) - len(stripped)
+    return line[:indent] + stripped[2 if stripped.startswith('# ') else 1:]
+
+def toggle_comment_lines(lines):
+    # إن كانت كل الأسطر غير الفارغة تعليقات تُزال، وإلا يُضاف "# " عند أقل إزاحة
+    code = [line for line in lines if line.strip()]
+    if code and all(line.lstrip().startswith('#') for line in code):
+        return [_uncomment_line(line) for line in lines]
+    indent = min((len(line) - len(line.lstrip()) for line in code), default=0)
+    return [line[:indent] + '# ' + line[indent:] if line.strip() else line for line in lines]
+
+def indent_lines(lines):
+    return [INDENT_UNIT + line if line.strip() else line for line in lines]
+
+def dedent_lines(lines):
+    dedented = []
+    for line in lines:
+        if line.startswith('\t'):
+            line = line[1:]
+        else:
+            width = len(line) - len(line.lstrip(' '))
+            line = line[min(width, len(INDENT_UNIT)):]
+        dedented.append(line)
+    return dedented
+
+SEARCH_MATCH_LIMIT = 100000
+SEARCH_TIME_BUDGET = 0.5
+SEARCH_SLICE_MIN_CHARS = 1 << 8
+SEARCH_SLICE_MAX_CHARS = 1 << 16
+SEARCH_SLICE_SECONDS = 0.002
+# ما يُعاد مسحه قبل حد كل شريحة؛ النتيجة الأطول منه قد تفوت عند الحد
+SEARCH_CARRY_CHARS = 1 << 8
+# فوق هذا الحجم يجري البحث في عملية عاملة على دفعات من أسطر كاملة
+OFFTHREAD_SEARCH_MIN_CHARS = 1 << 19
+SEARCH_WORKER_CHUNK_CHARS = 1 << 20
+LIVE_SEARCH_DELAY_MS = 120
+# مهلة إضافية فوق حد البحث قبل قتل العملية التي تمسح تعبيراً نمطياً
+SEARCH_KILL_GRACE = 0.1
+# أنماط البحث المترجمة من تعبير نمطي؛ النص الحرفي مسحه خطي فيبقى في العملية نفسها
+_REGEX_PATTERNS = weakref.WeakSet()
+
+@functools.lru_cache(maxsize=32)
+def compile_search_pattern(query, regex=False, case_sensitive=False, whole_word=False):
+    """يحوّل نص البحث وخياراته إلى نمط مُترجم؛ re.error إن كان التعبير النمطي غير صالح."""
+    pattern = query if regex else re.escape(query)
+    if whole_word:
+        pattern = rf'(?<!\w)(?:{pattern})(?!\w)'
+    flags = re.MULTILINE if regex else 0
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    compiled = re.compile(pattern, flags)
+    if regex:
+        _REGEX_PATTERNS.add(compiled)
+    return compiled
+
+def _find_all(pattern, text, offset=0, limit=None, deadline=None, final=True):
+    # كل نتائج pattern في text كمواضع UTF-16 (كمواضع Qt) مع أطوالها.
+    # المسح على شرائح من أسطر كاملة ليُفحص الحد الزمني بينها؛ complete خطأ
+    # إن توقف المسح عند limit أو deadline. النتيجة التي تبلغ السطر الأخير من
+    # الشريحة قد تكون مبتورة فلا تُقبل، والشريحة التالية تبدأ منها أو قبل ذلك
+    # السطر بـ SEARCH_CARRY_CHARS ليُعاد مسح ما قطعه الحد. مع final خطأ يُعامل
+    # آخر text كحد شريحة أيضاً، و resume (فهرس بايثون) هو ما حُسمت نتائجه قبله
+    positions = []
+    lengths = []
+    complete = True
+    position, scanned, size = 0, 0, len(text)
+    step = 0
+    while scanned < size and complete:
+        end = text.find('\n', max(position + step, scanned))
+        end = size if end < 0 else end + 1
+        # ذيل أطول من SEARCH_SLICE_MAX_CHARS بلا نتيجة مكتملة يُقبل كما هو
+        if (end < size or not final) and scanned - position <= SEARCH_SLICE_MAX_CHARS:
+            cut = max(text.rfind('\n', position, end - 1) + 1, position)
+            carry = max(position, cut - SEARCH_CARRY_CHARS)
+        else:
+            cut = carry = end
+        accepted = len(positions)
+        slice_started = time.perf_counter()
+        for match in pattern.finditer(text, position, end):
+            start, stop = match.span()
+            if stop > cut:
+                carry = min(carry, start)
+                break
+            if stop > start:
+                positions.append(start)
+                lengths.append(stop - start)
+                if limit is not None and len(positions) >= limit:
+                    complete = False
+                    break
+        if len(positions) > accepted:
+            carry = max(carry, positions[-1] + lengths[-1])
+        position, scanned = carry, end
+        now = time.perf_counter()
+        if deadline is not None and scanned < size and now > deadline:
+            complete = False
+        # الشرائح تكبر ما دام المسح سريعاً وتصغر إلى سطر واحد مع نمط بطيء
+        if now - slice_started < SEARCH_SLICE_SECONDS:
+            step = min(max(2 * step, SEARCH_SLICE_MIN_CHARS), SEARCH_SLICE_MAX_CHARS)
+        else:
+            step = 0
+    if positions and not text.isascii():
+        astral = [m.start() for m in _ASTRAL_RE.finditer(text)]
+        if astral:
+            lengths = [length + bisect.bisect_left(astral, start + length) - bisect.bisect_left(astral, start)
+                       for start, length in zip(positions, lengths)]
+            positions = [start + bisect.bisect_left(astral, start) for start in positions]
+    if offset:
+        positions = [start + offset for start in positions]
+    return positions, lengths, complete, position
+
+def _python_index(text, offset):
+    # عكس _utf16_offset: فهرس بايثون المقابل لموضع UTF-16
+    if text.isascii():
+        return offset
+    index = offset
+    for count, match in enumerate(_ASTRAL_RE.finditer(text)):
+        if match.start() + count >= offset:
+            break
+        index -= 1
+    return index
+
+def search_chunk(pattern, text, offset, limit, budget, final):
+    # يعمل في عملية العامل؛ يعيد أيضاً الوقت المستهلك ليُخصم من حد البحث كله
+    started = time.perf_counter()
+    deadline = None if budget is None else started + budget
+    positions, lengths, complete, resume = _find_all(pattern, text, offset, limit, deadline, final)
+    return positions, lengths, complete, resume, time.perf_counter() - started
+
+def find_all_within(pattern, text, offset=0, limit=None, budget=None, final=True):
+    # _find_all بحد زمني مضمون: التعبير النمطي يُمسح في العملية المعزولة وتُقتل
+    # إن تجاوزت budget، فلا يتوقف المحرر عند نمط بطيء داخل شريحة واحدة
+    if pattern not in _REGEX_PATTERNS:
+        deadline = None if budget is None else time.perf_counter() + budget
+        return _find_all(pattern, text, offset, limit, deadline, final)
+    timeout = None if budget is None else budget + SEARCH_KILL_GRACE
+    future = _get_isolated_worker('foreground').submit(timeout, search_chunk, pattern, text,
+                                                       offset, limit, budget, final)
+    try:
+        positions, lengths, complete, resume, _ = future.result()
+    except (TimeoutError, EOFError, OSError):
+        return [], [], False, 0
+    return positions, lengths, complete, resume
+
+class SearchIndex(QObject):
+    """نتائج البحث في المستند كمواضع مرتبة في فهرس مجزأ.
+
+    setPattern يمسح المستند مرة واحدة؛ بعدها contentsChange يعيد مسح الأسطر
+    المعدلة وما حولها فقط ويزيح ما بعدها، والتنقل بين
+    النتائج بحث ثنائي. searchInBackground يمسح لقطة من النص في عملية
+    العامل على دفعات تُضاف إلى الفهرس فور وصولها.
+    """
+
+    _chunkReady = pyqtSignal(int, object)
+    # بعد كل دفعة من البحث في الخلفية؛ True عند انتهائه
+    resultsStreamed = pyqtSignal(bool)
+
+    def __init__(self, document):
+        super().__init__()
+        self._document = document
+        self._matches = _ChunkedPositions()
+        self._snapshot = (-1, '')
+        self._revision = document.revision
+        self.pattern = None
+        self.complete = True
+        self.searching = False
+        self._generation = 0
+        self._job = None
+        self._job_position = (0, 0)
+        self._job_budget = None
+        self._future = None
+        # حد البحث الأخير يُطبق أيضاً على إعادة المسح بعد كل تعديل؛ ومتى تجاوزه
+        # النمط (stalled) لا يُعاد المسح مع التعديلات حتى يُعيَّن نمط جديد
+        self._budget = None
+        self._stalled = False
+        document.contentsChange.connect(self._onContentsChange)
+        self._chunkReady.connect(self._applyChunk)
+
+    def __len__(self):
+        return len(self._matches)
+
+    def setRevisionSource(self, revision):
+        # رقم نسخة لا يتغير مع تغييرات التنسيق وحدها (contentRevision في الملوِّن)
+        self._revision = revision
+
+    def snapshot(self):
+        # نص المستند مرة واحدة لكل نسخة؛ يتشاركه البحث والاستبدال
+        revision = self._revision()
+        if self._snapshot[0] != revision:
+            self._snapshot = (revision, _document_text(self._document))
+        return self._snapshot[1]
+
+    def setPattern(self, pattern, limit=None, budget=None):
+        self._cancel()
+        self.pattern = pattern
+        self.complete = True
+        self._budget = budget
+        self._stalled = False
+        self._matches.clear()
+        if pattern is not None:
+            positions, lengths, self.complete, _ = find_all_within(pattern, self.snapshot(), 0, limit, budget)
+            self._stalled = not self.complete and (limit is None or len(positions) < limit)
+            self._matches.splice(0, 0, 0, positions, lengths)
+
+    def searchInBackground(self, pattern, limit=None, budget=None):
+        self._cancel()
+        self.pattern = pattern
+        self.complete = False
+        self.searching = True
+        self._budget = budget
+        self._stalled = False
+        self._matches.clear()
+        # الحد الزمني هنا لوقت العامل وحده، لا لانتظار الدفعات في الطابور
+        self._job = (self.snapshot(), self._revision(), limit, budget)
+        self._job_position = (0, 0)
+        self._job_budget = budget
+        self._submitChunk()
+
+    def _cancel(self):
+        # نتائج الدفعات الجارية تُهمل عند وصولها لأن رقم الجيل تغيّر
+        self._generation += 1
+        self._job = None
+        self.searching = False
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def _submitChunk(self):
+        text, _, limit, _ = self._job
+        start, offset = self._job_position
+        end = text.find('\n', start + SEARCH_WORKER_CHUNK_CHARS)
+        end = len(text) if end < 0 else end + 1
+        remaining = None if limit is None else limit - len(self)
+        budget = None if self._job_budget is None else max(0.0, self._job_budget)
+        generation = self._generation
+        args = (self.pattern, text[start:end], offset, remaining, budget, end == len(text))
+        if self.pattern in _REGEX_PATTERNS:
+            timeout = None if budget is None else budget + SEARCH_KILL_GRACE
+            future = _get_isolated_worker('background').submit(timeout, search_chunk, *args)
+        else:
+            future = _get_worker_pool().submit(search_chunk, *args)
+        self._future = future
+        _deliver_result(future, self._chunkReady, generation)
+
+    def _applyChunk(self, generation, result):
+        if generation != self._generation:
+            return
+        text, revision, limit, budget = self._job
+        if revision != self._revision():
+            # تغيّر النص منذ أُخذت اللقطة: يُعاد البحث على لقطة جديدة
+            self.searchInBackground(self.pattern, limit, budget)
+            return
+        complete = False
+        if not isinstance(result, Exception):
+            positions, lengths, complete, resume, elapsed = result
+            if self._job_budget is not None:
+                self._job_budget -= elapsed
+            if positions:
+                self._matches.splice(positions[0], positions[0], 0, positions, lengths)
+            # الدفعة التالية تبدأ من ذيل هذه الذي لم تُحسم نتائجه
+            start, offset = self._job_position
+            self._job_position = (start + resume, offset + _utf16_offset(text[start:start + resume], resume))
+        done = not complete or self._job_position[0] >= len(text)
+        if done:
+            self.complete = complete
+            self._stalled = not complete and (limit is None or len(self) < limit)
+            self._cancel()
+        else:
+            self._submitChunk()
+        self.resultsStreamed.emit(done)
+
+    def clear(self):
+        self.setPattern(None)
+
+    def match(self, index):
+        start, length = self._matches.item(index)
+        return start, start + length
+
+    def indexAtOrAfter(self, position):
+        # أول نتيجة تبدأ عند position أو بعده
+        return self._matches.indexAtOrAfter(position)
+
+    def indexBefore(self, position):
+        # آخر نتيجة تنتهي عند position أو قبله (-1 إن لم توجد)
+        index = self.indexAtOrAfter(position) - 1
+        if index >= 0 and self.match(index)[1] > position:
+            index -= 1
+        return index
+
+    def _onContentsChange(self, position, chars_removed, chars_added):
+        if self.pattern is None:
+            return
+        doc = self._document
+        delta = chars_added - chars_removed
+        edited = position + chars_added
+        last = doc.characterCount() - 1
+        if self._stalled:
+            # النمط تجاوز حده على هذا المستند: تُحذف نتائج الأسطر المعدلة وحدها
+            block = doc.findBlock(edited)
+            end = block.position() + block.length() - 1
+            self._matches.splice(doc.findBlock(position).position(), end - delta, delta, [], [])
+            return
+        deadline = None if self._budget is None else time.perf_counter() + self._budget
+        # يبدأ المسح قبل التعديل بـ SEARCH_CARRY_CHARS، ومن بداية أي نتيجة تعبر
+        # ذلك الحد، فتُلتقط النتائج الممتدة عبر الأسطر إلى الجزء المعدل
+        start = doc.findBlock(max(0, position - SEARCH_CARRY_CHARS)).position()
+        index = self.indexBefore(start) + 1
+        while index < len(self) and self.match(index)[0] < start:
+            start = doc.findBlock(self.match(index)[0]).position()
+            index = self.indexBefore(start) + 1
+        end = edited + SEARCH_CARRY_CHARS
+        cursor = QTextCursor(doc)
+        while True:
+            block = doc.findBlock(min(end, last))
+            end = block.position() + block.length() - 1
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            text = cursor.selectedText().replace('\u2029', '\n')
+            budget = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            positions, lengths, complete, resume = find_all_within(self.pattern, text, start,
+                                                                   budget=budget, final=end >= last)
+            resume = max(start + _utf16_offset(text, resume), edited)
+            if not complete:
+                self.complete = False
+                self._stalled = True
+                break
+            # نتيجة قديمة تعبر resume لم يحسمها المسح الجديد: يمتد المسح إلى ما بعدها
+            index = self.indexAtOrAfter(resume - delta) - 1
+            if index < 0 or self.match(index)[1] <= resume - delta:
                 break
+            end = self.match(index)[1] + delta + SEARCH_CARRY_CHARS
+        self._matches.splice(start, resume - delta, delta, positions, lengths)
+
+# ============= البحث في الملفات =============
+FIND_IN_FILES_IGNORED_DIRS = frozenset({
+    '.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', 'env',
+    '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache', '.idea', '.vscode',
+})
+FIND_IN_FILES_BATCH = 128
+FIND_IN_FILES_MATCH_LIMIT = 5000
+FIND_IN_FILES_WALK_SLICE = 0.008
+BINARY_SNIFF_BYTES = 8192
+HIT_PREVIEW_CHARS = 200
+
+def _line_hits(pattern, text, limit):
+    # (رقم السطر، العمود، الطول، نص السطر) لكل نتيجة؛ الأعمدة بفهارس بايثون
+    hits = []
+    line, line_start = 0, 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if end == start:
+            continue
+        line += text.count('\n', line_start, start)
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        preview = text[line_start:line_end if line_end >= 0 else len(text)]
+        hits.append((line, start - line_start, end - start, preview[:HIT_PREVIEW_CHARS]))
+        if len(hits) >= limit:
+            break
+    return hits
+
+def search_text(pattern, text, limit):
+    # يعمل في عملية العامل: بحث في نص لسان تبويب مفتوح
+    return _line_hits(pattern, text, limit)
+
+def search_files(pattern, prefilter, paths, limit):
+    """يعمل في عملية العامل: [(path, hits)] للملفات النصية التي فيها نتائج.
+
+    الملفات تُقرأ عبر mmap؛ الثنائية منها (فيها NUL في أولها) تُتخطى، و
+    prefilter (نمط بايت اختياري) يستبعد ما لا نتيجة فيه دون فك ترميزه.
+    """
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data.find(b'\0', 0, BINARY_SNIFF_BYTES) >= 0:
+                        continue
+                    if prefilter is not None and prefilter.search(data) is None:
+                        continue
+                    text = data[:].decode('utf-8', errors='replace')
+        except (OSError, ValueError):
+            continue
+        hits = _line_hits(pattern, text, limit)
+        if hits:
+            results.append((path, hits))
+            limit -= len(hits)
+            if limit <= 0:
+                break
+    return results
 
-            if endIndex == -1:
-                self.setCurrentBlockState(1)
-                commentLength = len(text) - startIndex
+def bytes_prefilter(query, regex=False, case_sensitive=False):
+    # نمط بايت يطابق كل ملف قد يحوي النتيجة؛ None حين لا يمكن ضمان ذلك
+    # (التعبيرات النمطية، أو تجاهل حالة أحرف غير ASCII)
+    if regex or not (case_sensitive or query.isascii()):
+        return None
+    return re.compile(re.escape(query.encode('utf-8')), 0 if case_sensitive else re.IGNORECASE)
+
+def iter_source_files(root, skip=()):
+    for directory, subdirs, files in os.walk(root):
+        if 'pyvenv.cfg' in files and directory != root:
+            # بيئة افتراضية مهما كان اسمها
+            subdirs[:] = []
+            continue
+        subdirs[:] = [d for d in subdirs if d not in FIND_IN_FILES_IGNORED_DIRS]
+        for name in files:
+            path = os.path.join(directory, name)
+            if os.path.normcase(path) not in skip:
+                yield path
+
+# ============= تحليل المكتبات المستوردة =============
+# أسماء حزم pip التي تختلف عن اسم الوحدة المستوردة
+_PIP_NAME_ALIASES = {
+    'cv2': 'opencv-python', 'PIL': 'Pillow', 'yaml': 'PyYAML', 'sklearn': 'scikit-learn',
+    'bs4': 'beautifulsoup4', 'dateutil': 'python-dateutil', 'dotenv': 'python-dotenv',
+    'jwt': 'PyJWT', 'serial': 'pyserial', 'usb': 'pyusb', 'Crypto': 'pycryptodome',
+    'docx': 'python-docx', 'pptx': 'python-pptx', 'magic': 'python-magic',
+    'attr': 'attrs', 'google': 'protobuf', 'skimage': 'scikit-image', 'fitz': 'PyMuPDF',
+}
+IMPORT_CACHE_SIZE = 64
+_STDLIB_MODULES = frozenset(sys.stdlib_module_names) | frozenset(sys.builtin_module_names)
+
+def top_level_imports(tree):
+    # أسماء الوحدات العليا في كل import مطلق، أينما ورد في الشجرة
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.partition('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.add(node.module.partition('.')[0])
+    return modules
+
+@functools.lru_cache(maxsize=1)
+def _packages_distributions():
+    return importlib.metadata.packages_distributions()
+
+def _normalize_distribution(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def _distribution_for(module, distributions):
+    # الوحدة قد توفرها عدة توزيعات (PyQt6 و PyQt6-sip مثلاً)؛ نفضل ما يحمل اسمها
+    wanted = _normalize_distribution(module)
+    return next((d for d in distributions if _normalize_distribution(d) == wanted), distributions[0])
+
+def classify_modules(modules, directory=None, local_names=frozenset()):
+    """يفرز الوحدات إلى مكتبة قياسية، ومحلية (بجوار الملف أو ضمن local_names)،
+    ومثبتة (مع اسم التوزيعة التي توفرها)، ومفقودة (مع اسم حزمة pip المتوقع)."""
+    result = {'stdlib': [], 'local': [], 'installed': {}, 'missing': {}}
+    distributions = _packages_distributions()
+    for name in sorted(modules):
+        if name in _STDLIB_MODULES:
+            result['stdlib'].append(name)
+        elif name in local_names or directory and (os.path.isfile(os.path.join(directory, name + '.py'))
+                            or os.path.isdir(os.path.join(directory, name))):
+            result['local'].append(name)
+        else:
+            try:
+                found = importlib.util.find_spec(name) is not None
+            except (ImportError, ValueError):
+                found = False
+            if found:
+                result['installed'][name] = _distribution_for(name, distributions.get(name, [name]))
             else:
-                commentLength = endIndex - startIndex + quote_len
-                self.setCurrentBlockState(0)
+                result['missing'][name] = _PIP_NAME_ALIASES.get(name, name)
+    return result
+
+def analyze_imports(code, directory=None):
+    # يعمل في عملية العامل
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {'error': f"خطأ نحوي في السطر {e.lineno}: {e.msg}"}
+    return classify_modules(top_level_imports(tree), directory)
+
+# فحص مشروع كامل: نتيجة كل ملف تُحفظ على القرص مع mtime والحجم،
+# فلا يُعاد تحليل إلا ما تغيّر
+DEPENDENCY_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'editpython')
+DEPENDENCY_CACHE_VERSION = 1
+DEPENDENCY_SCAN_BATCH = 64
+
+def _dependency_cache_path(root):
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(DEPENDENCY_CACHE_DIR, f"deps-{digest}.json")
+
+def plan_dependency_scan(root):
+    """يعمل في عملية العامل: (entries, stale, changed).
+
+    entries هي مدخلات الذاكرة المخبأة التي ما زالت صالحة، و stale ملفات .py
+    الجديدة أو المعدلة، و changed صحيح إن لزم إعادة كتابة الذاكرة.
+    """
+    try:
+        with open(_dependency_cache_path(root), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        files = cached['files'] if cached.get('version') == DEPENDENCY_CACHE_VERSION else {}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        files = {}
+    entries, stale = {}, []
+    for path in iter_source_files(root):
+        if not path.endswith('.py'):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = files.get(path)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            entries[path] = entry
+        else:
+            stale.append(path)
+    return entries, stale, bool(stale) or len(entries) != len(files)
 
-            stringFormat = QTextCharFormat()
-            stringFormat.setForeground(QColor('#CE9178'))
-            self.setFormat(startIndex, commentLength, stringFormat)
-            
-            nextTripleDouble = text.find('"""', startIndex + commentLength)
-            nextTripleSingle = text.find("'''", startIndex + commentLength)
-            if nextTripleDouble == -1 and nextTripleSingle == -1:
-                startIndex = -1
-            elif nextTripleDouble == -1:
-                startIndex = nextTripleSingle
-            elif nextTripleSingle == -1:
-                 startIndex = nextTripleDouble
+def scan_import_files(paths):
+    # يعمل في عملية العامل: {path: [mtime_ns, size, modules]}
+    entries = {}
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+                stat = os.fstat(f.fileno())
+        except OSError:
+            continue
+        try:
+            modules = sorted(top_level_imports(ast.parse(source)))
+        except (SyntaxError, ValueError):
+            modules = []
+        entries[path] = [stat.st_mtime_ns, stat.st_size, modules]
+    return entries
+
+def _write_dependency_cache(root, entries):
+    path = _dependency_cache_path(root)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': DEPENDENCY_CACHE_VERSION, 'files': entries}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # الذاكرة المخبأة اختيارية
+
+def requirements_text(classification):
+    lines = []
+    for dist in sorted(set(classification['installed'].values()), key=str.lower):
+        try:
+            lines.append(f"{dist}=={importlib.metadata.version(dist)}")
+        except importlib.metadata.PackageNotFoundError:
+            lines.append(dist)
+    missing = sorted(set(classification['missing'].values()), key=str.lower)
+    if missing:
+        lines.append("# غير مثبتة في هذه البيئة:")
+        lines.extend(missing)
+    return "\n".join(lines) + "\n"
+
+def finish_dependency_scan(root, entries, changed):
+    # يعمل في عملية العامل: يحفظ الذاكرة ويعيد (نص requirements، التصنيف)
+    if changed:
+        _write_dependency_cache(root, entries)
+    modules, local_names = set(), set()
+    for path, (_, _, names) in entries.items():
+        modules.update(names)
+        parts = os.path.relpath(path, root).split(os.sep)
+        local_names.update(parts[:-1])
+        local_names.add(os.path.splitext(parts[-1])[0])
+    classification = classify_modules(modules, local_names=local_names)
+    return requirements_text(classification), classification
+
+# ============= تشغيل الكود =============
+RUN_TIMEOUT_SECONDS = 0  # صفر يعني بلا مهلة
+RUN_KILL_GRACE_MS = 2000
+RUN_HISTORY_LIMIT = 50
+RUN_HISTORY_OUTPUT_CHARS = 4000
+# قياس الأداء: أقل زمن للجولة عند المعايرة، وجولات الإحماء والقياس
+BENCH_MIN_TIME = 0.2
+BENCH_WARMUP_RUNS = 1
+BENCH_REPEATS = 10
+WARM_POOL_SIZE = 1
+
+# محمّل كل تشغيل: ينفذ السكربت كأنه __main__ ويكتب مقاييس الموارد في ملف JSON.
+# المهمة (JSON ومعها نص الكود) تصل في أول سطر من stdin -- بعد استيراد الوحدات المطلوبة
+# مسبقاً في المفسر المُسخَّن -- فلا يُكتب ملف مؤقت؛ ما يلي ذلك السطر من stdin يصل إلى السكربت.
+# يُسجَّل النص في linecache باسم ملف اللسان لتظهر أسطره في التتبع.
+# نمط 'profile' يشغّل cProfile حول السكربت وحده، ونمط 'lines' يسجل لكل سطر عدد مرات
+# تنفيذه والزمن حتى السطر التالي: بـ sys.monitoring (بايثون 3.12+) مع تعطيل الحدث في
+# أي ملف آخر فلا يكلف شيئاً، وإلا بـ sys.settrace مقصوراً على إطارات السكربت
+_RUN_BOOTSTRAP = r"""
+import sys, os, io, json, time, types, linecache, traceback, contextlib, importlib
+
+def _time_lines(script, source, output):
+    perf = time.perf_counter
+    size = source.count('\n') + 2
+    # قوائم مفهرسة برقم السطر أسرع من القواميس في كل حدث؛ العنصر 0 لما قبل أول سطر
+    hits = [0] * size
+    times = [0.0] * size
+    last = [0, perf()]  # (آخر سطر، وقت بدئه)؛ كلفة الخطاف نفسه تُحسب على السطر
+
+    monitoring = getattr(sys, 'monitoring', None)
+    if monitoring is not None:
+        tool = monitoring.PROFILER_ID
+        monitoring.use_tool_id(tool, 'editpython-line-timer')
+        DISABLE = monitoring.DISABLE
+
+        def on_line(code, line):
+            if code.co_filename != script:
+                return DISABLE
+            now = perf()
+            times[last[0]] += now - last[1]
+            hits[line] += 1
+            last[0] = line
+            last[1] = now
+
+        monitoring.register_callback(tool, monitoring.events.LINE, on_line)
+        monitoring.set_events(tool, monitoring.events.LINE)
+    else:
+        def trace_lines(frame, event, arg):
+            if event == 'line':
+                now = perf()
+                times[last[0]] += now - last[1]
+                hits[frame.f_lineno] += 1
+                last[0] = frame.f_lineno
+                last[1] = now
+            return trace_lines
+
+        sys.settrace(lambda frame, event, arg: trace_lines if frame.f_code.co_filename == script else None)
+
+    def finish():
+        if monitoring is not None:
+            monitoring.set_events(tool, 0)
+            monitoring.free_tool_id(tool)
+        else:
+            sys.settrace(None)
+        times[last[0]] += perf() - last[1]
+        with open(output, 'w') as f:
+            json.dump({line: [hits[line], times[line]] for line in range(1, size) if hits[line]}, f)
+    return finish
+
+def _peak_rss():
+    # على لينكس ru_maxrss يرث ذروة المحرر عبر fork/exec، أما VmHWM فخاص بهذه العملية
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _bench_code(script, bench):
+    # المقطع المقيس يصبح جسم حلقة تكرار دون تغيير أرقام أسطره
+    import ast
+    loop = ast.parse('for __editpython_i in __editpython_loops:\n    pass\n')
+    loop.body[0].body = ast.parse(bench['stmt'], script).body or loop.body[0].body
+    return compile(bench['setup'], script, 'exec'), compile(loop, script, 'exec')
+
+def _benchmark(code, namespace, bench, output):
+    # على نهج timeit: معايرة عدد التكرارات ثم إحماء ثم جولات مقيسة والـ GC معطل
+    import gc, itertools
+    setup, loop = code
+    exec(setup, namespace)
+    perf = time.perf_counter
+    def measure(number):
+        namespace['__editpython_loops'] = itertools.repeat(None, number)
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = perf()
+            exec(loop, namespace)
+            return perf() - start
+        finally:
+            if enabled:
+                gc.enable()
+    # 1، 2، 5، 10، 20، 50... حتى تتجاوز الجولة الحد الأدنى للزمن
+    for number in (factor * 10 ** power for power in itertools.count() for factor in (1, 2, 5)):
+        if measure(number) >= bench['min_time']:
+            break
+    for _ in range(bench['warmup']):
+        measure(number)
+    times = [measure(number) for _ in range(bench['repeat'])]
+    for name in ('__editpython_loops', '__editpython_i'):
+        namespace.pop(name, None)
+    with open(output, 'w') as f:
+        json.dump({'loops': number, 'warmup': bench['warmup'], 'times': times}, f)
+
+def _run(job):
+    script, source = job['filename'], job['source']
+    os.chdir(job['cwd'])
+    sys.argv = [script]
+    # اللسان غير المحفوظ يعمل مثل "python -": بلا __file__ ومجلد العمل في sys.path
+    saved = os.path.isabs(script)
+    sys.path[0] = os.path.dirname(script) if saved else job['cwd']
+    linecache.cache[script] = (len(source), None, source.splitlines(True), script)
+    try:
+        if job.get('mode') == 'bench':
+            code = _bench_code(script, job['bench'])
+        else:
+            code = compile(source, script, 'exec')
+    except SyntaxError as error:
+        traceback.print_exception(type(error), error, None)
+        sys.exit(1)
+    main = types.ModuleType('__main__')
+    if saved:
+        main.__file__ = script
+    main.__builtins__ = __builtins__
+    sys.modules['__main__'] = main
+
+    if job.get('tracemalloc'):
+        import tracemalloc
+        tracemalloc.start()
+    mode, finish = job.get('mode'), None
+    if mode == 'profile':
+        import cProfile
+        profiler = cProfile.Profile()
+        finish = lambda: profiler.dump_stats(job['output'])
+    elif mode == 'lines':
+        finish = _time_lines(script, source, job['output'])
+    cpu, wall = time.process_time(), time.perf_counter()
+    try:
+        if mode == 'profile':
+            profiler.runcall(exec, code, main.__dict__)
+        elif mode == 'bench':
+            _benchmark(code, main.__dict__, job['bench'], job['output'])
+        else:
+            exec(code, main.__dict__)
+    except SystemExit:
+        raise
+    except BaseException as error:
+        # إخفاء إطارات المحمّل من التتبع
+        tb = error.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(error), error, tb or error.__traceback__)
+        sys.exit(1)
+    finally:
+        metrics = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu,
+                   'peak_rss': _peak_rss(), 'tracemalloc_peak': None}
+        if job.get('tracemalloc'):
+            metrics['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if finish is not None:
+            finish()
+        if job.get('metrics'):
+            with open(job['metrics'], 'w') as f:
+                json.dump(metrics, f)
+
+if sys.argv[1:2] == ['--warm']:
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for _module in sys.argv[2:]:
+            try:
+                importlib.import_module(_module)
+            except Exception:
+                pass
+_line = sys.stdin.buffer.readline()
+if not _line:
+    sys.exit(0)
+_run(json.loads(_line))
+"""
+
+def _format_bytes(size):
+    if size is None:
+        return "—"
+    for unit in ("بايت", "ك.ب", "م.ب"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "بايت" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} ج.ب"
+
+def _format_seconds(seconds):
+    for unit, scale in (("ث", 1), ("مللي ث", 1e-3), ("ميكرو ث", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} نانو ث"
+
+def _run_environment():
+    env = QProcessEnvironment.systemEnvironment()
+    env.insert("PYTHONUNBUFFERED", "1")
+    env.insert("PYTHONIOENCODING", "utf-8")
+    return env
+
+class InterpreterPool(QObject):
+    """مفسرات بايثون تُشغَّل مسبقاً وتستورد الوحدات الثقيلة قبل الحاجة إليها.
+    كل تشغيل يأخذ مفسراً لم يُستخدم من قبل، ويُبدأ غيره مكانه."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.preimports = []
+        self.size = WARM_POOL_SIZE
+        self._idle = []
+
+    def isEnabled(self):
+        return bool(self.preimports) and self.size > 0
+
+    def configure(self, preimports, size=None):
+        self.preimports = list(preimports)
+        if size is not None:
+            self.size = size
+        self.shutdown()
+        self._refill()
+
+    def acquire(self):
+        process = None
+        while self._idle and process is None:
+            candidate = self._idle.pop(0)
+            candidate.finished.disconnect()
+            candidate.errorOccurred.disconnect()
+            if candidate.state() == QProcess.ProcessState.NotRunning:
+                candidate.deleteLater()
+            else:
+                process = candidate
+        QTimer.singleShot(0, self._refill)
+        return process
+
+    def shutdown(self):
+        for process in self._idle:
+            process.finished.disconnect()
+            process.errorOccurred.disconnect()
+            process.kill()
+            process.waitForFinished(1000)
+            process.deleteLater()
+        self._idle = []
+
+    def _refill(self):
+        while self.isEnabled() and len(self._idle) < self.size:
+            process = QProcess(self)
+            process.setProcessEnvironment(_run_environment())
+            # مفسر مات وهو ينتظر لا يُعوَّض إلا عند الطلب التالي، تجنباً لحلقة إعادة تشغيل
+            process.finished.connect(lambda *_, p=process: self._discard(p))
+            process.errorOccurred.connect(lambda *_, p=process: self._discard(p))
+            process.start(sys.executable or "python", ["-u", "-c", _RUN_BOOTSTRAP, "--warm", *self.preimports])
+            self._idle.append(process)
+
+    def _discard(self, process):
+        if process in self._idle and process.state() == QProcess.ProcessState.NotRunning:
+            self._idle.remove(process)
+            process.deleteLater()
+
+class CodeRunner(QObject):
+    """يشغّل الكود في عملية بايثون منفصلة ويبث إخراجها فور وصوله."""
+    outputReceived = pyqtSignal(str, bool)  # (النص، هل هو من stderr)
+    # (رمز الخروج، سبب الإنهاء: '' أو 'stopped' أو 'timeout' أو 'crashed' أو 'failed')
+    runFinished = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._process = None
+        self._reason = ''
+        self._decoders = {}
+        self.warm = False
+        # اسم الكود في التتبع ونتائج المحلل لربطها بأسطر اللسان
+        self.filename = None
+        self._timeout_timer = QTimer(self)
+        self._timeout_timer.setSingleShot(True)
+        self._timeout_timer.timeout.connect(lambda: self.stop('timeout'))
+        # مهلة بين طلب الإنهاء والقتل القسري
+        self._kill_timer = QTimer(self)
+        self._kill_timer.setSingleShot(True)
+        self._kill_timer.setInterval(RUN_KILL_GRACE_MS)
+        self._kill_timer.timeout.connect(self._killProcess)
+
+    def isRunning(self):
+        return self._process is not None
+
+    def start(self, code, filename, working_dir=None, timeout=0, pool=None, mode=None, output_path=None,
+              metrics_path=None, trace_memory=False, bench=None):
+        self.filename = filename
+        working_dir = working_dir or tempfile.gettempdir()
+
+        # أنماط القياس تحتاج مفسراً جديداً يبدأ والقياس مفعّل
+        process = pool.acquire() if pool is not None and mode is None else None
+        self.warm = process is not None
+        if self.warm:
+            process.setParent(self)
+        else:
+            process = QProcess(self)
+            process.setProcessEnvironment(_run_environment())
+            process.setWorkingDirectory(working_dir)
+        process.readyReadStandardOutput.connect(lambda: self._read(False))
+        process.readyReadStandardError.connect(lambda: self._read(True))
+        process.finished.connect(self._onFinished)
+        process.errorOccurred.connect(self._onError)
+        # مفكك تدريجي لكل قناة حتى لا ينقسم حرف متعدد البايتات بين دفعتين
+        self._decoders = {stream: codecs.getincrementaldecoder('utf-8')('replace') for stream in (False, True)}
+        self._reason = ''
+        self._process = process
+        job = json.dumps({'source': code, 'filename': filename, 'cwd': working_dir, 'mode': mode, 'output': output_path,
+                          'metrics': metrics_path, 'tracemalloc': trace_memory, 'bench': bench})
+        if not self.warm:
+            process.start(sys.executable or "python", ["-u", "-c", _RUN_BOOTSTRAP])
+        if self._process is None:
+            return
+        # تُحفظ في مخزن QProcess حتى يبدأ المفسر
+        process.write((job + '\n').encode('utf-8'))
+        if timeout > 0:
+            self._timeout_timer.start(int(timeout * 1000))
+
+    def write(self, text):
+        if self._process is not None:
+            self._process.write(text.encode('utf-8'))
+
+    def closeInput(self):
+        if self._process is not None:
+            self._process.closeWriteChannel()
+
+    def stop(self, reason='stopped'):
+        if self._process is None or self._kill_timer.isActive():
+            return
+        self._reason = reason
+        self._timeout_timer.stop()
+        # لا يوجد SIGTERM لعمليات الطرفية على ويندوز
+        if sys.platform == "win32":
+            self._process.kill()
+        else:
+            self._process.terminate()
+            self._kill_timer.start()
+
+    def _killProcess(self):
+        if self._process is not None:
+            self._process.kill()
+
+    def shutdown(self):
+        # إيقاف فوري عند إغلاق اللسان: ما بقي من الإخراج يصل و runFinished يصدر قبل العودة
+        if self._process is None:
+            return
+        self._reason = self._reason or 'stopped'
+        self._process.kill()
+        self._process.waitForFinished(RUN_KILL_GRACE_MS)
+
+    def _read(self, is_error):
+        process = self._process
+        if process is None:
+            return
+        data = process.readAllStandardError() if is_error else process.readAllStandardOutput()
+        text = self._decoders[is_error].decode(bytes(data))
+        if text:
+            self.outputReceived.emit(text, is_error)
+
+    def _onFinished(self, exit_code, exit_status):
+        self._read(False)
+        self._read(True)
+        for is_error, decoder in self._decoders.items():
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                self.outputReceived.emit(tail, is_error)
+        reason = self._reason or ('crashed' if exit_status == QProcess.ExitStatus.CrashExit else '')
+        self._cleanup()
+        self.runFinished.emit(exit_code, reason)
+
+    def _onError(self, error):
+        # لا تصدر finished عندما تفشل العملية في البدء
+        if error == QProcess.ProcessError.FailedToStart and self._process is not None:
+            self._cleanup()
+            self.runFinished.emit(-1, 'failed')
+
+    def _cleanup(self):
+        self._timeout_timer.stop()
+        self._kill_timer.stop()
+        if self._process is not None:
+            self._process.deleteLater()
+            self._process = None
+
+PROFILE_MAX_ROWS = 2000
+
+def load_profile(path, limit=PROFILE_MAX_ROWS):
+    # يعمل في عملية العامل: يقرأ ملف pstats ويحذفه، ويعيد الصفوف
+    # [(الدالة، الملف، السطر، الاستدعاءات، الأولية، الزمن الذاتي، التراكمي)] بالأثقل أولاً
+    try:
+        stats = pstats.Stats(path)
+    finally:
+        os.remove(path)
+    rows = [(func, filename, line, nc, cc, tt, ct)
+            for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items()]
+    rows.sort(key=lambda row: row[6], reverse=True)
+    return rows[:limit], len(rows), stats.total_tt
+
+# علامة نهاية الخلية: تكتبها النواة على stdout وstderr معاً، فوصولها على القناتين
+# يعني أن كل إخراج الخلية قد وصل. وتسبق طلبات التنفيذ على stdin أيضاً
+KERNEL_MARKER = '\x00editpython-kernel:'
+_CELL_MARKER_RE = re.compile(r'^\s*#\s*%%')
+# خلية "# %% setup" تُنفذ مرة واحدة قبل قياس الأداء ولا تدخل في الزمن
+_BENCH_SETUP_RE = re.compile(r'^\s*#\s*%%\s*(setup|إعداد)\b', re.IGNORECASE)
+
+_KERNEL_BOOTSTRAP = r"""
+import sys, os, ast, json, types, linecache, traceback, builtins
+
+def _kernel():
+    marker = '\x00editpython-kernel:'
+    main = types.ModuleType('__main__')
+    main.__builtins__ = builtins
+    sys.modules['__main__'] = main
+    namespace = main.__dict__
+    while True:
+        try:
+            line = sys.stdin.buffer.readline()
+        except KeyboardInterrupt:
+            continue
+        if not line:
+            return
+        # أسطر إدخال لم تقرأها الخلية السابقة
+        if not line.startswith(marker.encode()):
+            continue
+        job = json.loads(line[len(marker):])
+        status = 'ok'
+        try:
+            filename = job['filename']
+            # الإزاحة تجعل أرقام الأسطر في التتبع مطابقة لأسطر المحرر
+            source = '\n' * job['line'] + job['code']
+            # أسطر الخلية تحل محل نسختها السابقة، فيبقى مصدر الخلايا الأخرى في التتبع
+            lines = linecache.cache.get(filename, (0, None, [], filename))[2]
+            cell = job['code'].splitlines(True)
+            lines = lines + ['\n'] * (job['line'] + len(cell) - len(lines))
+            lines[job['line']:job['line'] + len(cell)] = cell
+            linecache.cache[filename] = (0, None, lines, filename)
+            tree = ast.parse(source, filename)
+            last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+            exec(compile(tree, filename, 'exec'), namespace)
+            if last is not None:
+                value = eval(compile(ast.Expression(last.value), filename, 'eval'), namespace)
+                if value is not None:
+                    namespace['_'] = value
+                    print(repr(value))
+        except BaseException as error:
+            status = 'interrupted' if isinstance(error, KeyboardInterrupt) else 'error'
+            tb = None if isinstance(error, SyntaxError) else error.__traceback__.tb_next
+            traceback.print_exception(type(error), error, tb)
+        for stream in (sys.stdout, sys.stderr):
+            stream.write(f'{marker}{status}\n')
+            stream.flush()
+
+_kernel()
+"""
+
+def cell_bounds(lines, line):
+    # (أول سطر، السطر بعد الأخير) لخلية "# %%" التي تحوي line، دون سطر العلامة
+    start = line
+    while start >= 0 and not _CELL_MARKER_RE.match(lines[start]):
+        start -= 1
+    end = start + 1
+    while end < len(lines) and not _CELL_MARKER_RE.match(lines[end]):
+        end += 1
+    return start + 1, end
+
+class PythonKernel(QObject):
+    """مفسر بايثون دائم لكل لسان: ينفذ الخلايا في مساحة أسماء واحدة تبقى بين التشغيلات."""
+    outputReceived = pyqtSignal(str, bool)
+    cellStarted = pyqtSignal(int, object)  # (رقم التنفيذ، المهمة)
+    cellFinished = pyqtSignal(str, float)  # (الحالة: 'ok' أو 'error' أو 'interrupted'، المدة)
+    kernelExited = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._process = None
+        self._queue = []
+        self._busy = False
+        self._decoders = {}
+        self._carry = {}
+        self._done = {}
+        self._started = 0.0
+        self.working_dir = None
+        self.execution_count = 0
+
+    def isAlive(self):
+        return self._process is not None
+
+    def isBusy(self):
+        return self._busy or bool(self._queue)
+
+    def execute(self, code, first_line, filename):
+        if self._process is None:
+            self._start()
+        self._queue.append({'code': code, 'line': first_line, 'filename': filename})
+        if not self._busy:
+            self._sendNext()
+
+    def write(self, text):
+        if self._process is not None and self._busy:
+            self._process.write(text.encode('utf-8'))
+
+    def interrupt(self):
+        if self._process is None or not self._busy:
+            return False
+        self._queue.clear()
+        if sys.platform == "win32":
+            # لا يمكن إرسال Ctrl+C إلى عملية بلا طرفية، فتُعاد النواة من جديد
+            self.restart()
+        else:
+            os.kill(self._process.processId(), signal.SIGINT)
+        return True
+
+    def restart(self):
+        self.shutdown()
+        self._start()
+
+    def shutdown(self):
+        self._queue.clear()
+        self._busy = False
+        process, self._process = self._process, None
+        if process is not None:
+            process.finished.disconnect()
+            process.kill()
+            process.waitForFinished(1000)
+            process.deleteLater()
+
+    def _start(self):
+        process = QProcess(self)
+        process.setProcessEnvironment(_run_environment())
+        if self.working_dir:
+            process.setWorkingDirectory(self.working_dir)
+        process.readyReadStandardOutput.connect(lambda: self._read(False))
+        process.readyReadStandardError.connect(lambda: self._read(True))
+        process.finished.connect(self._onFinished)
+        self._decoders = {stream: codecs.getincrementaldecoder('utf-8')('replace') for stream in (False, True)}
+        self._carry = {False: '', True: ''}
+        self._busy = False
+        self.execution_count = 0
+        self._process = process
+        process.start(sys.executable or "python", ["-u", "-c", _KERNEL_BOOTSTRAP])
+
+    def _sendNext(self):
+        job = self._queue.pop(0)
+        self._busy = True
+        self._done = {False: None, True: None}
+        self.execution_count += 1
+        self._started = time.perf_counter()
+        self.cellStarted.emit(self.execution_count, job)
+        self._process.write((KERNEL_MARKER + json.dumps(job) + '\n').encode('utf-8'))
+
+    def _read(self, is_error):
+        process = self._process
+        if process is None:
+            return
+        data = process.readAllStandardError() if is_error else process.readAllStandardOutput()
+        text = self._carry[is_error] + self._decoders[is_error].decode(bytes(data))
+        self._carry[is_error] = ''
+        while text:
+            index = text.find('\x00')
+            if index < 0:
+                self.outputReceived.emit(text, is_error)
+                break
+            if index:
+                self.outputReceived.emit(text[:index], is_error)
+                text = text[index:]
+            end = text.find('\n')
+            if text.startswith(KERNEL_MARKER) and end >= 0:
+                self._done[is_error] = text[len(KERNEL_MARKER):end]
+                text = text[end + 1:]
+                self._checkDone()
+            elif end < 0 and KERNEL_MARKER.startswith(text[:len(KERNEL_MARKER)]):
+                # علامة لم يكتمل وصولها بعد
+                self._carry[is_error] = text
+                break
+            else:
+                self.outputReceived.emit(text[0], is_error)
+                text = text[1:]
+
+    def _checkDone(self):
+        if None in self._done.values():
+            return
+        status = self._done[False]
+        self._busy = False
+        self.cellFinished.emit(status, time.perf_counter() - self._started)
+        if self._queue and self._process is not None:
+            self._sendNext()
+
+    def _onFinished(self, exit_code, exit_status):
+        self._read(False)
+        self._read(True)
+        self._process.deleteLater()
+        self._process = None
+        self._queue.clear()
+        self._busy = False
+        self.kernelExited.emit(exit_code)
+
+OUTPUT_MAX_LINES = 20000
+OUTPUT_FLUSH_MS = 33  # نحو 30 إطاراً في الثانية
+
+class OutputConsole(QPlainTextEdit):
+    """طرفية إخراج محدودة الأسطر: تجمع الإخراج وتكتبه دفعة واحدة لكل إطار،
+    وتنقل الأسطر الأقدم من الحد إلى ملف جانبي يمكن فتحه عند الطلب."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.max_lines = OUTPUT_MAX_LINES
+        self._pending = []  # [(النص، هل هو من stderr)] بترتيب الوصول
+        # آخر سطر غير مكتمل لكل قناة، يُكتب حين تهدأ القناة إطاراً كاملاً
+        # حتى لا تقطع أسطر stderr سطراً من stdout في منتصفه
+        self._partial = {False: '', True: ''}
+        self._partial_fresh = {False: False, True: False}
+        self._spill = None
+        self.spilled_lines = 0
+        # يُسأل قبل حذف الملف الجانبي: True إن كان مفتوحاً في لسان تبويب فيُترك له
+        self.keep_spill = lambda path: False
+        self._error_color = QColor("red")
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(OUTPUT_FLUSH_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def set_dark_mode(self, dark):
+        self._error_color = QColor("red") if dark else QColor("darkred")
+
+    def write(self, text, is_error=False):
+        if not text:
+            return
+        end = text.rfind('\n') + 1
+        if end:
+            self._queue(self._partial[is_error] + text[:end], is_error)
+            self._partial[is_error] = text[end:]
+        else:
+            self._partial[is_error] += text
+        self._partial_fresh[is_error] = True
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _queue(self, text, is_error):
+        if self._pending and self._pending[-1][1] == is_error:
+            self._pending[-1][0].append(text)
+        else:
+            self._pending.append(([text], is_error))
+
+    def appendPlainText(self, text):
+        self.flush(partial=True)
+        super().appendPlainText(text)
+
+    def clear(self):
+        self._flush_timer.stop()
+        self._pending = []
+        self._partial = {False: '', True: ''}
+        self.discardSpill()
+        super().clear()
+
+    def spillPath(self):
+        if self._spill is None:
+            return None
+        self._spill.flush()
+        return self._spill.name
+
+    def discardSpill(self):
+        if self._spill is None:
+            return
+        path = self._spill.name
+        self._spill.close()
+        self._spill = None
+        self.spilled_lines = 0
+        if self.keep_spill(path):
+            return
+        try: os.remove(path)
+        except OSError as e: print(f"Warning: Could not delete spill file {path}: {e}", file=sys.stderr)
+
+    def _spillText(self, text):
+        if self._spill is None:
+            self._spill = tempfile.NamedTemporaryFile(mode='w', prefix='editpython-output-', suffix='.txt',
+                                                      delete=False, encoding='utf-8', errors='replace')
+        self._spill.write(text)
+        self.spilled_lines += text.count('\n')
+
+    def flush(self, partial=False):
+        self._flush_timer.stop()
+        for is_error, tail in self._partial.items():
+            if not tail:
+                continue
+            if partial or not self._partial_fresh[is_error]:
+                self._queue(tail, is_error)
+                self._partial[is_error] = ''
             else:
-                 startIndex = min(nextTripleDouble, nextTripleSingle)
+                self._partial_fresh[is_error] = False
+                self._flush_timer.start()
+        if not self._pending:
+            return
+        chunks = [(''.join(parts), is_error) for parts, is_error in self._pending]
+        self._pending = []
+        doc = self.document()
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+
+        # دفعة تتجاوز الحد وحدها: ما في المستند وبداية الدفعة يذهبان للملف مباشرة
+        # دون إدراجهما ثم حذفهما
+        excess = sum(text.count('\n') for text, _ in chunks) - self.max_lines + 1
+        if excess > 0:
+            if not doc.isEmpty():
+                self._spillText(_document_text(doc) + '\n')
+                super().clear()
+            while excess > 0:
+                text, is_error = chunks[0]
+                count = text.count('\n')
+                if count <= excess:
+                    self._spillText(text)
+                    chunks.pop(0)
+                    excess -= count
+                    continue
+                cut = -1
+                for _ in range(excess):
+                    cut = text.index('\n', cut + 1)
+                self._spillText(text[:cut + 1])
+                chunks[0] = (text[cut + 1:], is_error)
+                break
+
+        normal = QTextCharFormat()
+        normal.setForeground(self.palette().color(QPalette.ColorRole.Text))
+        error = QTextCharFormat()
+        error.setForeground(self._error_color)
+        cursor = QTextCursor(doc)
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        for text, is_error in chunks:
+            cursor.insertText(text, error if is_error else normal)
+        overflow = doc.blockCount() - self.max_lines
+        if overflow > 0:
+            cursor.movePosition(QTextCursor.MoveOperation.Start)
+            cursor.setPosition(doc.findBlockByNumber(overflow).position(), QTextCursor.MoveMode.KeepAnchor)
+            self._spillText(cursor.selectedText().replace('\u2029', '\n'))
+            cursor.removeSelectedText()
+        cursor.endEditBlock()
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
 
 class LineNumberArea(QWidget):
     def __init__(self, editor):
@@ -132,21 +2230,69 @@ class LineNumberArea(QWidget):
     def paintEvent(self, event):
         self.editor.lineNumberAreaPaintEvent(event)
 
+    def event(self, event):
+        if event.type() == QEvent.Type.ToolTip:
+            text = self.editor.lineErrorToolTip(event.pos().y()) or self.editor.lineHeatToolTip(event.pos().y())
+            if text:
+                QToolTip.showText(event.globalPos(), text, self)
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().event(event)
+
     def updateFontMetrics(self):
         self._font_metrics = self.fontMetrics()
 
+# كل إشارات المؤشر والتعديل خلال إطار واحد تُدمج في تحديث واحد للتظليل
+DECORATION_FRAME_MS = 16
+# عرض شريط توقيت الأسطر في الهامش
+HEAT_BAR_WIDTH = 28
+
 class TextEditWithLineNumbers(QPlainTextEdit):
+    # يُطلق بعد كل تحديث مدمج للتظليل (يُستخدم لتحديث شريط الحالة)
+    decorationsUpdated = pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        # رقم السطر (من الصفر) ← (مرات التنفيذ، الثواني) من آخر تشغيل مع توقيت الأسطر
+        self.lineHeat = {}
+        self._heat_max = 0.0
+        self._heat_total = 0.0
+        self._heat_block_count = 0
         self.lineNumberArea = LineNumberArea(self)
         self._main_window = self.window()
+        self._line_number_width = -1
         self._bracket_match_positions = []
         self._bracket_format = QTextCharFormat()
+        self.bracketIndex = BracketIndex(self.document())
+        self.searchIndex = SearchIndex(self.document())
+
+        # طبقات ExtraSelection؛ تُعاد بناء الطبقة المتسخة فقط ثم تُجمع مرة واحدة
+        self._decoration_layers = {'line': [], 'error': [], 'brackets': [], 'search': []}
+        self._dirty_decorations = set()
+        self._decoration_timer = QTimer(self)
+        self._decoration_timer.setSingleShot(True)
+        self._decoration_timer.setInterval(DECORATION_FRAME_MS)
+        self._decoration_timer.timeout.connect(self._flushDecorations)
+
+        # نتائج البحث في searchIndex كمواضع فقط؛ لا تُنشأ ExtraSelection إلا لما يظهر في منطقة العرض
+        self._search_current = -1
+        self._search_format = QTextCharFormat()
+        self._search_current_format = QTextCharFormat()
+        self._search_window = None
+
+        # آخر خطأ ترجمة: مؤشر يتحرك مع النص، ويزول بتعديل سطره
+        self._error_cursor = None
+        self._error_message = ""
         
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberArea)
-        self.cursorPositionChanged.connect(self.highlightCurrentLine)
-        self.cursorPositionChanged.connect(self.matchBrackets)
+        self.cursorPositionChanged.connect(self._onCursorPositionChanged)
+        self.verticalScrollBar().valueChanged.connect(self._onViewportMoved)
+        self.document().contentsChange.connect(self._onSearchIndexChanged)
+        self.document().contentsChange.connect(self._shiftLineHeat)
+        self.document().contentsChange.connect(self._clearErrorOnEdit)
 
         self.updateLineNumberAreaWidth(0)
         self.highlightCurrentLine()
@@ -154,6 +2300,153 @@ class TextEditWithLineNumbers(QPlainTextEdit):
     def set_dark_mode(self, is_dark):
         self._bracket_format.setBackground(QColor(80, 80, 80, 150) if is_dark else QColor(200, 200, 200, 150))
         self._bracket_format.setFontWeight(QFont.Weight.Bold)
+        self.scheduleDecorations('line', 'error', 'brackets')
+
+    def _onCursorPositionChanged(self):
+        self.scheduleDecorations('line', 'brackets')
+
+    def scheduleDecorations(self, *layers):
+        self._dirty_decorations.update(layers)
+        if not self._decoration_timer.isActive():
+            self._decoration_timer.start()
+
+    def setSearchResults(self, current, highlight_format, current_format):
+        self._search_current = current
+        self._search_format = highlight_format
+        self._search_current_format = current_format
+        self._search_window = None
+        self.scheduleDecorations('search')
+
+    def clearSearchResults(self):
+        self.searchIndex.clear()
+        self.setSearchResults(-1, self._search_format, self._search_current_format)
+
+    def visiblePositionRange(self):
+        first = self.firstVisibleBlock().position()
+        last_block = self.cursorForPosition(QPoint(0, self.viewport().height())).block()
+        return first, last_block.position() + last_block.length()
+
+    def _searchSelections(self):
+        results = self.searchIndex
+        if results.pattern is None or not len(results):
+            return []
+        first, last = self._search_window = self.visiblePositionRange()
+        lo = results.indexBefore(first) + 1
+        hi = results.indexAtOrAfter(last)
+        doc = self.document()
+        selections = []
+        for i in range(lo, hi):
+            start, end = results.match(i)
+            selection = QTextEdit.ExtraSelection()
+            selection.format = self._search_current_format if i == self._search_current else self._search_format
+            selection.cursor = QTextCursor(doc)
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            selections.append(selection)
+        return selections
+
+    def _onViewportMoved(self, *_):
+        if self.searchIndex.pattern is not None and self._search_window != self.visiblePositionRange():
+            self.scheduleDecorations('search')
+
+    def setLineHeat(self, heat):
+        self.lineHeat = heat
+        self._heat_max = max((seconds for _, seconds in heat.values()), default=0.0)
+        self._heat_total = sum(seconds for _, seconds in heat.values())
+        self._heat_block_count = self.blockCount()
+        self.updateLineNumberAreaWidth()
+        self.lineNumberArea.update()
+
+    def _shiftLineHeat(self, position, removed, added):
+        # الأسطر بعد موضع التعديل تنتقل مع نصها، والأسطر المحذوفة تسقط
+        delta = self.blockCount() - self._heat_block_count
+        if not self.lineHeat or not delta:
+            return
+        self._heat_block_count = self.blockCount()
+        block = self.document().findBlock(position)
+        # تعديل في بداية السطر ينقل السطر نفسه أيضاً
+        line = block.blockNumber() - (position == block.position())
+        self.lineHeat = {number + (delta if number > line else 0): value
+                         for number, value in self.lineHeat.items()
+                         if number <= line or number + delta > line}
+        self.lineNumberArea.update()
+
+    def setErrorLine(self, line, column=0, message=""):
+        block = self.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + max(0, min(column, block.length() - 1)))
+        self._error_cursor = cursor
+        self._error_message = message
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        self.scheduleDecorations('error')
+
+    def clearErrorLine(self):
+        if self._error_cursor is not None:
+            self._error_cursor = None
+            self.scheduleDecorations('error')
+
+    def _clearErrorOnEdit(self, position, removed, added):
+        if self._error_cursor is None:
+            return
+        block = self._error_cursor.block()
+        if position <= block.position() + block.length() - 1 and position + added >= block.position():
+            self.clearErrorLine()
+
+    def _errorSelections(self):
+        if self._error_cursor is None:
+            return []
+        is_dark = self._main_window.is_dark_mode if self._main_window and hasattr(self._main_window, 'is_dark_mode') else False
+        line = QTextEdit.ExtraSelection()
+        line.format.setBackground(QColor(90, 30, 30) if is_dark else QColor(255, 221, 221))
+        line.format.setProperty(QTextCharFormat.Property.FullWidthSelection, True)
+        line.cursor = QTextCursor(self._error_cursor)
+        line.cursor.clearSelection()
+        mark = QTextEdit.ExtraSelection()
+        mark.format.setUnderlineStyle(QTextCharFormat.UnderlineStyle.WaveUnderline)
+        mark.format.setUnderlineColor(QColor(220, 50, 50))
+        mark.cursor = QTextCursor(self._error_cursor)
+        mark.cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor)
+        return [line, mark]
+
+    def lineErrorToolTip(self, y):
+        if self._error_cursor is None:
+            return ""
+        line = self.cursorForPosition(QPoint(0, y)).blockNumber()
+        return self._error_message if line == self._error_cursor.blockNumber() else ""
+
+    def lineHeatToolTip(self, y):
+        if not self.lineHeat:
+            return ""
+        line = self.cursorForPosition(QPoint(0, y)).blockNumber()
+        value = self.lineHeat.get(line)
+        if value is None:
+            return ""
+        hits, seconds = value
+        share = seconds / self._heat_total if self._heat_total else 0.0
+        return f"السطر {line + 1}: {hits} مرة، {seconds * 1000:.2f} مللي ث ({share:.1%})"
+
+    def _onSearchIndexChanged(self, *_):
+        if self.searchIndex.pattern is not None:
+            self.scheduleDecorations('search')
+
+    def _flushDecorations(self):
+        dirty = self._dirty_decorations
+        self._dirty_decorations = set()
+        layers = self._decoration_layers
+        if 'line' in dirty:
+            layers['line'] = self._currentLineSelections()
+        if 'brackets' in dirty:
+            self._updateBracketMatchPositions()
+            layers['brackets'] = self._bracketSelections()
+        if 'search' in dirty:
+            layers['search'] = self._searchSelections()
+        if 'error' in dirty:
+            layers['error'] = self._errorSelections()
+        self.setExtraSelections(layers['line'] + layers['error'] + layers['brackets'] + layers['search'])
+        self.decorationsUpdated.emit()
 
     def lineNumberAreaWidth(self):
         digits = 1
@@ -162,10 +2455,15 @@ class TextEditWithLineNumbers(QPlainTextEdit):
             max_num /= 10
             digits += 1
         space = 10 + self.fontMetrics().horizontalAdvance('9') * digits
+        if self.lineHeat:
+            space += HEAT_BAR_WIDTH
         return space
 
     def updateLineNumberAreaWidth(self, _=None):
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        width = self.lineNumberAreaWidth()
+        if width != self._line_number_width:
+            self._line_number_width = width
+            self.setViewportMargins(width, 0, 0, 0)
 
     def updateLineNumberArea(self, rect, dy):
         if dy:
@@ -176,8 +2474,14 @@ class TextEditWithLineNumbers(QPlainTextEdit):
         if rect.contains(self.viewport().rect()):
             self.updateLineNumberAreaWidth(0)
 
+    def visibleBlockRange(self):
+        first = self.firstVisibleBlock().blockNumber()
+        last = self.cursorForPosition(self.viewport().rect().bottomLeft()).blockNumber()
+        return first, last
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self._onViewportMoved()
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
 
@@ -204,8 +2508,16 @@ class TextEditWithLineNumbers(QPlainTextEdit):
         font = painter.font()
         painter.setFont(font)
 
+        heat, heat_max = self.lineHeat, self._heat_max
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
+                value = heat.get(blockNumber) if heat else None
+                if value is not None:
+                    # الطول واللون (من الأصفر إلى الأحمر) بنسبة زمن السطر إلى أبطأ سطر
+                    fraction = value[1] / heat_max if heat_max else 0.0
+                    length = max(2, int((HEAT_BAR_WIDTH - 4) * fraction))
+                    painter.fillRect(2, int(top) + 2, length, height - 4,
+                                     QColor.fromHsvF((1.0 - fraction) / 6.0, 0.9, 0.95))
                 number = str(blockNumber + 1)
                 painter.drawText(0, int(top), width - num_margin, height,
                                  Qt.AlignmentFlag.AlignRight, number)
@@ -218,33 +2530,30 @@ class TextEditWithLineNumbers(QPlainTextEdit):
             blockNumber += 1
 
     def highlightCurrentLine(self):
-        extraSelections = []
-
-        if not self.isReadOnly():
-            selection = QTextEdit.ExtraSelection()
-            is_dark = self._main_window.is_dark_mode if self._main_window and hasattr(self._main_window, 'is_dark_mode') else False
-            lineColor = QColor(51, 51, 51) if is_dark else QColor(232, 232, 232)
-            selection.format.setBackground(lineColor)
-            selection.format.setProperty(QTextCharFormat.Property.FullWidthSelection, True)
-            selection.cursor = self.textCursor()
-            selection.cursor.clearSelection()
-            extraSelections.append(selection)
+        self.scheduleDecorations('line')
 
+    def _currentLineSelections(self):
+        if self.isReadOnly():
+            return []
+        selection = QTextEdit.ExtraSelection()
+        is_dark = self._main_window.is_dark_mode if self._main_window and hasattr(self._main_window, 'is_dark_mode') else False
+        lineColor = QColor(51, 51, 51) if is_dark else QColor(232, 232, 232)
+        selection.format.setBackground(lineColor)
+        selection.format.setProperty(QTextCharFormat.Property.FullWidthSelection, True)
+        selection.cursor = self.textCursor()
+        selection.cursor.clearSelection()
+        return [selection]
+
+    def _bracketSelections(self):
+        selections = []
         for pos, length in self._bracket_match_positions:
              sel = QTextEdit.ExtraSelection()
              sel.format = self._bracket_format
              sel.cursor = self.textCursor()
              sel.cursor.setPosition(pos)
              sel.cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor, length)
-             extraSelections.append(sel)
-        
-        # Keep search highlights
-        current_extra_selections = self.extraSelections()
-        for sel in current_extra_selections:
-             if sel.format.property(QTextCharFormat.Property.UserProperty) == "search_highlight":
-                 extraSelections.append(sel)
-
-        self.setExtraSelections(extraSelections)
+             selections.append(sel)
+        return selections
 
     def setFont(self, font):
         super().setFont(font)
@@ -279,6 +2588,9 @@ class TextEditWithLineNumbers(QPlainTextEdit):
             super().keyPressEvent(event)
 
     def matchBrackets(self):
+        self.scheduleDecorations('brackets')
+
+    def _updateBracketMatchPositions(self):
         self._bracket_match_positions = []
         cursor = self.textCursor()
         pos = cursor.position()
@@ -299,12 +2611,12 @@ class TextEditWithLineNumbers(QPlainTextEdit):
                       self._bracket_match_positions.append((pos, 1))
                       self._bracket_match_positions.append((match_pos, 1))
 
-        self.highlightCurrentLine()
-
     def _findMatchingBracket(self, position, char):
-        brackets = {'(': ')', ')': '(', '[': ']', ']': '[', '{': '}', '}': '{'}
+        brackets = _BRACKET_PARTNERS
         if char not in brackets:
             return None
+        if self.bracketIndex.complete:
+            return self.bracketIndex.findMatch(position, char)
 
         match_char = brackets[char]
         doc = self.document()
@@ -343,6 +2655,8 @@ class EditorPage(QWidget):
         super().__init__()
         self.main_window = main_window
         self.current_file = None
+        # ملف إخراج جانبي تركته طرفيته لهذا اللسان؛ يُحذف عند إغلاقه
+        self.spill_file = None
         self.is_dark_mode = self.main_window.is_dark_mode
         self.create_widgets()
     
@@ -351,15 +2665,55 @@ class EditorPage(QWidget):
         self.textEdit.setFont(QFont("Consolas", 12))
         self.textEdit.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
         self.highlighter = PythonSyntaxHighlighter(self.textEdit.document())
+        self.highlighter.setBracketIndex(self.textEdit.bracketIndex)
+        self.textEdit.searchIndex.setRevisionSource(self.highlighter.contentRevision)
         
-        self.outputConsole = QPlainTextEdit()
+        self.outputConsole = OutputConsole()
         self.outputConsole.setFont(QFont("Consolas", 11))
-        self.outputConsole.setReadOnly(True)
         self.outputConsole.setPlaceholderText("سيظهر إخراج الكود هنا...")
 
+        # سطر الإدخال يُرسل إلى stdin للبرنامج أثناء تشغيله
+        self.runner = CodeRunner(self)
+        self.inputEntry = QLineEdit()
+        self.inputEntry.setFont(QFont("Consolas", 11))
+        self.inputEntry.setPlaceholderText("إدخال للبرنامج (Enter للإرسال)...")
+        self.inputEntry.setEnabled(False)
+        self.inputEntry.returnPressed.connect(self.send_input)
+        self.endInputBtn = QPushButton("إنهاء الإدخال")
+        self.endInputBtn.setToolTip("إغلاق stdin (EOF)")
+        self.endInputBtn.setEnabled(False)
+        self.endInputBtn.clicked.connect(self.runner.closeInput)
+        self.stopRunBtn = QPushButton("⏹️ إيقاف")
+        self.stopRunBtn.setEnabled(False)
+        self.stopRunBtn.clicked.connect(self.stop_execution)
+        self.runner.outputReceived.connect(self.append_output)
+        self.runner.outputReceived.connect(self._record_output)
+        self.runner.runFinished.connect(self.run_finished)
+        # سجل تشغيلات هذا اللسان، الأقدم أولاً
+        self.run_history = []
+        self._run_count = 0
+        self.kernel = PythonKernel(self)
+        self.kernel.outputReceived.connect(self.append_output)
+        self.kernel.cellStarted.connect(self.cell_started)
+        self.kernel.cellFinished.connect(self.cell_finished)
+        self.kernel.kernelExited.connect(self.kernel_exited)
+
+        inputLayout = QHBoxLayout()
+        inputLayout.setContentsMargins(0, 0, 0, 0)
+        inputLayout.addWidget(self.inputEntry)
+        inputLayout.addWidget(self.endInputBtn)
+        inputLayout.addWidget(self.stopRunBtn)
+        outputLayout = QVBoxLayout()
+        outputLayout.setContentsMargins(0, 0, 0, 0)
+        outputLayout.setSpacing(2)
+        outputLayout.addWidget(self.outputConsole)
+        outputLayout.addLayout(inputLayout)
+        self.outputPanel = QWidget()
+        self.outputPanel.setLayout(outputLayout)
+
         self.splitter = QSplitter(Qt.Orientation.Vertical)
         self.splitter.addWidget(self.textEdit)
-        self.splitter.addWidget(self.outputConsole)
+        self.splitter.addWidget(self.outputPanel)
         self.splitter.setStretchFactor(0, 3)
         self.splitter.setStretchFactor(1, 1)
         self.splitter.setSizes([600, 200])
@@ -369,18 +2723,705 @@ class EditorPage(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
 
-        self.textEdit.textChanged.connect(self.main_window.update_current_tab_title)
-        self.textEdit.cursorPositionChanged.connect(self.main_window.updateLineColStatus)
+        self.textEdit.document().modificationChanged.connect(self.main_window.update_current_tab_title)
+        self.textEdit.decorationsUpdated.connect(self.main_window.updateLineColStatus)
+        self.textEdit.updateRequest.connect(self.highlight_viewport)
+        self.highlighter.blocksRelexed.connect(self.report_relex_count)
+        self.textEdit.searchIndex.resultsStreamed.connect(self.report_search_results)
+
+    def report_relex_count(self, count):
+        if self.main_window.active_editor_page() is self:
+            self.main_window.updateRelexStatus(count)
+
+    def report_search_results(self, done):
+        if self.main_window.active_editor_page() is self:
+            self.main_window.showSearchResults(done)
+
+    def start_run(self, code, timeout, pool=None, mode=None, trace_memory=False, bench=None):
+        self.outputConsole.clear()
+        self.textEdit.clearErrorLine()
+        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._run_record = {'time': timestamp, 'hash': hashlib.sha1(code.encode('utf-8', 'surrogatepass')).hexdigest()[:10],
+                            'mode': mode, 'tracemalloc': trace_memory}
+        self._run_output_tail = ''
+        self.append_output(f"--- بدأ التشغيل: {timestamp} ---\n", False)
+        working_dir = os.path.dirname(os.path.abspath(self.current_file)) if self.current_file else None
+        self._run_started = time.perf_counter()
+        self._run_timeout = timeout
+        self._run_mode = mode
+        self._run_output = None
+        if mode:
+            fd, self._run_output = tempfile.mkstemp(prefix='editpython-', suffix='.prof' if mode == 'profile' else '.json')
+            os.close(fd)
+        fd, self._run_metrics = tempfile.mkstemp(prefix='editpython-', suffix='.json')
+        os.close(fd)
+        self.runner.start(code, self.code_filename(), working_dir, timeout, pool, mode, self._run_output, self._run_metrics,
+                          trace_memory, bench)
+        self.update_run_controls()
+        if self.runner.isRunning():
+            self.inputEntry.setFocus()
+
+    def code_filename(self):
+        # اسم الكود في التتبع: مسار الملف، أو اسم اللسان بين <> إن لم يُحفظ
+        if self.current_file:
+            return os.path.abspath(self.current_file)
+        return f"<{self.main_window.tab_widget.tabText(self.main_window.tab_widget.indexOf(self)).rstrip('*')}>"
+
+    def report_syntax_error(self, error):
+        # خطأ الترجمة المسبقة: يُعرض في الإخراج ويُعلَّم سطره دون تشغيل أي عملية
+        self.outputConsole.clear()
+        self.write_banner("--- خطأ قبل التشغيل، لم يبدأ المفسر ---\n")
+        self.outputConsole.write(''.join(traceback.format_exception_only(type(error), error)), True)
+        lineno = getattr(error, 'lineno', None)
+        if lineno:
+            self.textEdit.setErrorLine(lineno - 1, (error.offset or 1) - 1, f"{type(error).__name__}: {error.msg}")
+
+    def run_cell(self, code, first_line):
+        if not self.kernel.isAlive():
+            self.kernel.working_dir = os.path.dirname(os.path.abspath(self.current_file)) if self.current_file else None
+        self.kernel.execute(code, first_line, self.code_filename())
+        self.update_run_controls()
+
+    def update_run_controls(self):
+        active = self.runner.isRunning() or self.kernel.isBusy()
+        self.inputEntry.setEnabled(active)
+        self.stopRunBtn.setEnabled(active)
+        self.endInputBtn.setEnabled(self.runner.isRunning())
+
+    def stop_execution(self):
+        if self.runner.isRunning():
+            self.runner.stop()
+        else:
+            self.kernel.interrupt()
+
+    def send_input(self):
+        text = self.inputEntry.text()
+        self.inputEntry.clear()
+        self.append_output(text + '\n', False)
+        if self.runner.isRunning():
+            self.runner.write(text + '\n')
+        else:
+            self.kernel.write(text + '\n')
+
+    def append_output(self, text, is_error):
+        self.outputConsole.write(text, is_error)
+
+    def _record_output(self, text, is_error):
+        # آخر الإخراج فقط يُحفظ في سجل التشغيل
+        self._run_output_tail = (self._run_output_tail + text)[-RUN_HISTORY_OUTPUT_CHARS:]
+
+    def write_banner(self, message):
+        # سطر فاصل يبدأ بعد سطر فارغ مهما كان آخر ما كُتب
+        console = self.outputConsole
+        console.flush(partial=True)
+        if not console.document().isEmpty():
+            cursor = QTextCursor(console.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            message = ('\n' if cursor.atBlockStart() else '\n\n') + message
+        console.write(message)
+        console.flush(partial=True)
+        console.moveCursor(QTextCursor.MoveOperation.End)
+
+    def cell_started(self, count, job):
+        first = job['line'] + 1
+        last = first + job['code'].rstrip('\n').count('\n')
+        self.write_banner(f"--- [{count}] الأسطر {first}–{last} ---\n")
+
+    def cell_finished(self, status, elapsed):
+        self.update_run_controls()
+        if status == 'interrupted':
+            self.write_banner("--- أُوقفت الخلية ---\n")
+        if self.main_window.active_editor_page() is self:
+            state = {'ok': "انتهت", 'error': "انتهت بخطأ", 'interrupted': "أُوقفت"}.get(status, status)
+            self.main_window.updateStatusBar(f"الخلية [{self.kernel.execution_count}] {state} في {elapsed:.2f} ث")
+
+    def kernel_exited(self, exit_code):
+        self.update_run_controls()
+        self.write_banner(f"--- توقفت النواة (رمز الخروج: {exit_code})، ستبدأ نواة جديدة مع الخلية التالية ---\n")
+
+    def run_finished(self, exit_code, reason):
+        self.update_run_controls()
+        elapsed = time.perf_counter() - self._run_started
+        if reason == 'failed':
+            message = f"لم يتم العثور على مفسر بايثون ({sys.executable or 'python'})"
+            status = "فشل تشغيل الكود: مفسر بايثون غير موجود."
+        elif reason == 'timeout':
+            message = f"خطأ: انتهت مهلة التشغيل ({self._run_timeout:g} ثانية)!"
+            status = "فشل تشغيل الكود: انتهت المهلة."
+        elif reason == 'stopped':
+            message = f"أُوقف التشغيل بعد {elapsed:.2f} ث"
+            status = "تم إيقاف الكود."
+        else:
+            message = f"انتهى (رمز الخروج: {exit_code}) في {elapsed:.2f} ث"
+            status = f"انتهى الكود (رمز الخروج: {exit_code})."
+        metrics = self._finish_run_record(exit_code, reason, elapsed)
+        if metrics:
+            message += f" — CPU {metrics['cpu']:.2f} ث، أقصى ذاكرة {_format_bytes(metrics['peak_rss'])}"
+            if metrics['tracemalloc_peak'] is not None:
+                message += f"، ذروة tracemalloc {_format_bytes(metrics['tracemalloc_peak'])}"
+        if self.outputConsole.spillPath():
+            message += f" — الأسطر الأقدم في {self.outputConsole.spillPath()}"
+        self.write_banner(f"--- {message} ---\n")
+        if self.main_window.active_editor_page() is self:
+            self.main_window.updateStatusBar(status)
+        output, self._run_output = self._run_output, None
+        if not output:
+            return
+        # القياس الفاشل لا يكتب نتائج؛ التتبع ظاهر في الإخراج
+        if reason not in ('', 'crashed') or (self._run_mode == 'bench' and exit_code != 0):
+            os.remove(output)
+        elif self._run_mode == 'profile':
+            self.main_window.showProfile(self, output, self.runner.filename)
+        elif self._run_mode == 'lines':
+            self.main_window.showLineTiming(self, output)
+        elif self._run_mode == 'bench':
+            self.main_window.showBenchmark(self, output)
+
+    def _finish_run_record(self, exit_code, reason, elapsed):
+        # يضيف التشغيل المنتهي إلى السجل ويعيد مقاييس الابن أو None إن لم يكتبها
+        metrics_path, self._run_metrics = self._run_metrics, None
+        try:
+            with open(metrics_path, encoding='utf-8') as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            metrics = None
+        finally:
+            os.remove(metrics_path)
+        self._run_count += 1
+        record = dict(self._run_record, number=self._run_count, exit_code=exit_code, reason=reason,
+                      wall=elapsed, output=self._run_output_tail)
+        for key in ('cpu', 'peak_rss', 'tracemalloc_peak'):
+            record[key] = metrics.get(key) if metrics else None
+        self.run_history.append(record)
+        del self.run_history[:-RUN_HISTORY_LIMIT]
+        self.main_window.runHistoryChanged(self)
+        return metrics
+
+    def highlight_viewport(self, *_):
+        self.highlighter.setVisibleBlocks(*self.textEdit.visibleBlockRange())
+
+    def load_text(self, content):
+        line_count = content.count('\n')
+        if line_count >= LAZY_HIGHLIGHT_MIN_BLOCKS:
+            self.highlighter.beginLazyHighlighting()
+        self.textEdit.setPlainText(content)
+        if line_count >= OFFTHREAD_TOKENIZE_MIN_BLOCKS:
+            self.highlighter.tokenizeInBackground()
+        self.highlight_viewport()
+
+    def _apply_difference(self, old_text, new_text, base=0):
+        # تعديل واحد على المقطع المختلف فقط، فيُتراجع عنه بخطوة واحدة
+        # ولا يُعاد تحليل ما لم يتغير. old_text هو نص المستند بدءاً من base
+        start, old_end, new_end = text_difference(old_text, new_text)
+        if start == old_end == new_end:
+            return False
+        replaced = new_text[start:new_end]
+        line_count = replaced.count('\n') + old_text.count('\n', start, old_end)
+        # الأسطر المستبدلة خارج منطقة العرض تُلوَّن لاحقاً عند الخمول
+        if line_count >= LAZY_HIGHLIGHT_CHUNK and not self.highlighter.isLazy():
+            self.highlighter.beginLazyHighlighting()
+
+        cursor = QTextCursor(self.textEdit.document())
+        cursor.beginEditBlock()
+        cursor.setPosition(base + _utf16_offset(old_text, start))
+        cursor.setPosition(base + _utf16_offset(old_text, old_end), QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(replaced)
+        cursor.endEditBlock()
+
+        if line_count >= OFFTHREAD_TOKENIZE_MIN_BLOCKS:
+            self.highlighter.tokenizeInBackground()
+        return True
+
+    def replace_text(self, new_text, old_text=None):
+        document = self.textEdit.document()
+        if old_text is None:
+            old_text = _document_text(document)
+        view_cursor = self.textEdit.textCursor()
+        line, column = view_cursor.blockNumber(), view_cursor.positionInBlock()
+        scroll = self.textEdit.verticalScrollBar().value()
+        if not self._apply_difference(old_text, new_text):
+            return
+
+        # المؤشر يبقى في سطره وعموده بدل أن يقفز إلى نهاية المقطع المستبدل
+        block = document.findBlockByNumber(min(line, document.blockCount() - 1))
+        view_cursor.setPosition(block.position() + min(column, block.length() - 1))
+        self.textEdit.setTextCursor(view_cursor)
+        self.textEdit.verticalScrollBar().setValue(scroll)
+        self.highlight_viewport()
+
+    def transform_selected_lines(self, transform):
+        # الأسطر المحددة تُقرأ كشريحة واحدة وتُحوَّل بتمريرة واحدة ثم تُكتب كتعديل واحد
+        document = self.textEdit.document()
+        cursor = self.textEdit.textCursor()
+        had_selection = cursor.hasSelection()
+        column = cursor.positionInBlock()
+        start_block = document.findBlock(cursor.selectionStart())
+        end_block = document.findBlock(cursor.selectionEnd())
+        if end_block != start_block and cursor.selectionEnd() == end_block.position():
+            end_block = end_block.previous()  # تحديد ينتهي في أول سطر لا يشمله
+        first, last = start_block.blockNumber(), end_block.blockNumber()
+        start = start_block.position()
+        old_length = end_block.position() + end_block.length() - 1 - start
+
+        slice_cursor = QTextCursor(document)
+        slice_cursor.setPosition(start)
+        slice_cursor.setPosition(start + old_length, QTextCursor.MoveMode.KeepAnchor)
+        old_text = slice_cursor.selectedText().replace('\u2029', '\n')
+        new_text = '\n'.join(transform(old_text.split('\n')))
+        if not self._apply_difference(old_text, new_text, start):
+            return
+
+        start_block = document.findBlockByNumber(first)
+        end_block = document.findBlockByNumber(last)
+        if had_selection:
+            cursor.setPosition(start_block.position())
+            cursor.setPosition(end_block.position() + end_block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+        else:
+            column += start_block.length() - 1 - old_length
+            cursor.setPosition(start_block.position() + max(0, min(column, start_block.length() - 1)))
+        self.textEdit.setTextCursor(cursor)
+        self.textEdit.ensureCursorVisible()
+        self.highlight_viewport()
+
+class FindInFilesPanel(QWidget):
+    """بحث في كل ألسنة التبويب المفتوحة وفي شجرة مجلد.
+
+    المجلد يُمشى على شرائح زمنية من حلقة الأحداث، ودفعات الملفات تُمسح في
+    مجمع عمليات؛ النتائج تُضاف إلى القائمة فور وصولها.
+    """
+
+    _batchReady = pyqtSignal(int, object, object, object)
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self._generation = 0
+        self._futures = set()
+        self._walker = None
+        self._batch = []
+        self._hit_count = 0
+        self._file_count = 0
+        self._started = 0.0
+
+        self.queryEntry = QLineEdit()
+        self.queryEntry.setPlaceholderText("ابحث في الملفات...")
+        self.queryEntry.returnPressed.connect(self.startSearch)
+        self.directoryEntry = QLineEdit(os.getcwd())
+        self.browseBtn = QPushButton("...")
+        self.browseBtn.clicked.connect(self.chooseDirectory)
+        self.caseSensitiveCheck = QCheckBox("حساس لحالة الأحرف")
+        self.wholeWordCheck = QCheckBox("كلمة كاملة")
+        self.regexCheck = QCheckBox("تعبير نمطي")
+        self.searchBtn = QPushButton("بحث")
+        self.searchBtn.clicked.connect(self.startSearch)
+        self.stopBtn = QPushButton("إيقاف")
+        self.stopBtn.clicked.connect(self.stopSearch)
+        self.statusLabel = QLabel("")
+        self.resultsList = QListWidget()
+        self.resultsList.setFont(QFont("Consolas", 10))
+        self.resultsList.itemClicked.connect(self.openHit)
+        self.resultsList.itemActivated.connect(self.openHit)
+
+        optionsLayout = QHBoxLayout()
+        optionsLayout.addWidget(self.queryEntry, 2)
+        optionsLayout.addWidget(QLabel("في:"))
+        optionsLayout.addWidget(self.directoryEntry, 2)
+        optionsLayout.addWidget(self.browseBtn)
+        optionsLayout.addWidget(self.caseSensitiveCheck)
+        optionsLayout.addWidget(self.wholeWordCheck)
+        optionsLayout.addWidget(self.regexCheck)
+        optionsLayout.addWidget(self.searchBtn)
+        optionsLayout.addWidget(self.stopBtn)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.addLayout(optionsLayout)
+        layout.addWidget(self.statusLabel)
+        layout.addWidget(self.resultsList)
+        self.setLayout(layout)
+
+        self._walk_timer = QTimer(self)
+        self._walk_timer.setSingleShot(True)
+        self._walk_timer.setInterval(0)
+        self._walk_timer.timeout.connect(self._walkSlice)
+        self._batchReady.connect(self._addResults)
+
+    def chooseDirectory(self):
+        directory = QFileDialog.getExistingDirectory(self, "اختر مجلداً", self.directoryEntry.text())
+        if directory:
+            self.directoryEntry.setText(directory)
+
+    def stopSearch(self):
+        self._generation += 1
+        self._walk_timer.stop()
+        self._walker = None
+        self._batch = []
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+
+    def isSearching(self):
+        return self._walker is not None or bool(self._futures)
+
+    def startSearch(self):
+        self.stopSearch()
+        self.resultsList.clear()
+        self._hit_count = self._file_count = 0
+        query = self.queryEntry.text()
+        if not query:
+            self.statusLabel.setText("")
+            return
+        try:
+            self._pattern = compile_search_pattern(query, self.regexCheck.isChecked(),
+                                                   self.caseSensitiveCheck.isChecked(), self.wholeWordCheck.isChecked())
+        except re.error as e:
+            self.statusLabel.setText(f"تعبير نمطي غير صالح: {e}")
+            return
+        self._prefilter = bytes_prefilter(query, self.regexCheck.isChecked(), self.caseSensitiveCheck.isChecked())
+        self._started = time.perf_counter()
+        generation = self._generation
+        executor = _get_worker_pool()
+
+        # الألسنة المفتوحة تُبحث بنصها الحالي، وتُستبعد نسخها على القرص
+        skip = set()
+        tabs = self.main_window.tab_widget
+        for i in range(tabs.count()):
+            page = tabs.widget(i)
+            if page.current_file:
+                skip.add(os.path.normcase(os.path.abspath(page.current_file)))
+            text = page.textEdit.searchIndex.snapshot()
+            future = executor.submit(search_text, self._pattern, text, FIND_IN_FILES_MATCH_LIMIT)
+            self._track(future, generation, lambda hits, page=page: [(page, hits)] if hits else [])
+
+        directory = self.directoryEntry.text()
+        if directory and os.path.isdir(directory):
+            self._walker = iter_source_files(os.path.abspath(directory), skip)
+            self._walk_timer.start()
+        self._updateStatus()
+
+    def _track(self, future, generation, convert=None):
+        self._futures.add(future)
+        _deliver_result(future, self._batchReady, generation, future, convert)
+
+    def _walkSlice(self):
+        walker = self._walker
+        if walker is None:
+            return
+        deadline = time.perf_counter() + FIND_IN_FILES_WALK_SLICE
+        for path in walker:
+            self._batch.append(path)
+            if len(self._batch) >= FIND_IN_FILES_BATCH:
+                self._submitBatch()
+            if time.perf_counter() > deadline:
+                self._walk_timer.start()
+                return
+        self._walker = None
+        self._submitBatch()
+        self._updateStatus()
+
+    def _submitBatch(self):
+        if not self._batch:
+            return
+        paths, self._batch = self._batch, []
+        self._file_count += len(paths)
+        future = _get_worker_pool().submit(search_files, self._pattern, self._prefilter,
+                                             paths, FIND_IN_FILES_MATCH_LIMIT)
+        self._track(future, self._generation)
+
+    def _addResults(self, generation, future, convert, results):
+        if generation != self._generation:
+            return
+        self._futures.discard(future)
+        if isinstance(results, Exception):
+            results = []
+        elif convert is not None:
+            results = convert(results)
+        for source, hits in results:
+            name = source if isinstance(source, str) else self.main_window.tab_widget.tabText(
+                self.main_window.tab_widget.indexOf(source))
+            for line, column, length, preview in hits:
+                if self._hit_count >= FIND_IN_FILES_MATCH_LIMIT:
+                    break
+                item = QListWidgetItem(f"{name}:{line + 1}:{column + 1}: {preview.strip()}")
+                item.setData(Qt.ItemDataRole.UserRole, (source, line, column, length))
+                self.resultsList.addItem(item)
+                self._hit_count += 1
+        if self._hit_count >= FIND_IN_FILES_MATCH_LIMIT:
+            self.stopSearch()
+        self._updateStatus()
+
+    def _updateStatus(self):
+        message = f"{self._hit_count} نتيجة — {self._file_count} ملف"
+        if self.isSearching():
+            message += " (جارٍ البحث...)"
+        elif self._hit_count >= FIND_IN_FILES_MATCH_LIMIT:
+            message += f" (توقف عند {FIND_IN_FILES_MATCH_LIMIT} نتيجة)"
+        else:
+            message += f" في {time.perf_counter() - self._started:.2f} ث"
+        self.statusLabel.setText(message)
+
+    def openHit(self, item):
+        source, line, column, length = item.data(Qt.ItemDataRole.UserRole)
+        if isinstance(source, str):
+            page = self.main_window.openPath(source)
+        else:
+            page = source if self.main_window.tab_widget.indexOf(source) >= 0 else None
+        if page is None:
+            return
+        self.main_window.tab_widget.setCurrentWidget(page)
+        block = page.textEdit.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        text = block.text()
+        start = block.position() + _utf16_offset(text, column)
+        cursor = page.textEdit.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(block.position() + _utf16_offset(text, column + length), QTextCursor.MoveMode.KeepAnchor)
+        page.textEdit.setTextCursor(cursor)
+        page.textEdit.centerCursor()
+        page.textEdit.setFocus()
+
+class _SortableItem(QTableWidgetItem):
+    # خلية تُرتَّب حسب قيمتها الرقمية لا حسب نصها
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value < other.value
+
+class ProfilePanel(QWidget):
+    """جدول الدوال الأثقل في آخر تشغيل مع المحلل."""
+    COLUMNS = ("الدالة", "الموقع", "الاستدعاءات", "الزمن الذاتي (ث)", "الزمن التراكمي (ث)", "التراكمي لكل استدعاء (ث)")
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self._page = None
+        self._script = None
+
+        self.summaryLabel = QLabel("")
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setFont(QFont("Consolas", 10))
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.itemDoubleClicked.connect(self.openRow)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.addWidget(self.summaryLabel)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def setProfile(self, page, script, rows, function_count, total_time):
+        self._page, self._script = page, script
+        bold = QFont(self.table.font())
+        bold.setBold(True)
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row, (func, filename, line, nc, cc, tt, ct) in enumerate(rows):
+            in_buffer = filename == script
+            if in_buffer:
+                location = f"السطر {line}"
+            elif filename == '~':  # دوال مدمجة
+                location = ""
+            else:
+                location = f"{os.path.basename(filename)}:{line}"
+            items = [
+                QTableWidgetItem(func),
+                QTableWidgetItem(location),
+                _SortableItem(str(nc) if nc == cc else f"{nc}/{cc}", nc),
+                _SortableItem(f"{tt:.6f}", tt),
+                _SortableItem(f"{ct:.6f}", ct),
+                # كما في pstats: التراكمي يُقسم على الاستدعاءات الأولية (غير العودية)
+                _SortableItem(f"{ct / cc:.6f}" if cc else "", ct / cc if cc else 0.0),
+            ]
+            items[0].setData(Qt.ItemDataRole.UserRole, (filename, line))
+            items[1].setToolTip(filename)
+            for column, item in enumerate(items):
+                if in_buffer:
+                    item.setFont(bold)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(4, Qt.SortOrder.DescendingOrder)
+        self.table.resizeColumnsToContents()
+        summary = f"{function_count} دالة، إجمالي الزمن {total_time:.3f} ث"
+        if len(rows) < function_count:
+            summary += f" — تُعرض أثقل {len(rows)}"
+        self.summaryLabel.setText(summary + ". انقر مرتين على دالة من الكود للانتقال إليها.")
+
+    def openRow(self, item):
+        filename, line = self.table.item(item.row(), 0).data(Qt.ItemDataRole.UserRole)
+        page = self._page
+        if filename != self._script or page is None or self.main_window.tab_widget.indexOf(page) < 0:
+            self.main_window.updateStatusBar("هذه الدالة ليست في كود اللسان.")
+            return
+        self.main_window.tab_widget.setCurrentWidget(page)
+        block = page.textEdit.document().findBlockByNumber(max(line - 1, 0))
+        if not block.isValid():
+            return
+        cursor = page.textEdit.textCursor()
+        cursor.setPosition(block.position())
+        page.textEdit.setTextCursor(cursor)
+        page.textEdit.centerCursor()
+        page.textEdit.setFocus()
+
+class RunHistoryPanel(QWidget):
+    """سجل تشغيلات اللسان النشط، ومقارنة تشغيلين جنباً إلى جنب."""
+    COLUMNS = ("#", "الوقت", "بصمة الكود", "النمط", "النتيجة", "الزمن (ث)", "CPU (ث)", "أقصى RSS", "ذروة tracemalloc")
+    MODES = {None: "عادي", 'profile': "محلل", 'lines': "توقيت الأسطر", 'bench': "قياس أداء"}
+    # (العنوان، المفتاح، دالة التنسيق)؛ المقاييس الرقمية تُقارن بنسبة التغير
+    METRICS = (
+        ("الزمن الكلي", 'wall', lambda v: f"{v:.3f} ث"),
+        ("زمن CPU", 'cpu', lambda v: f"{v:.3f} ث"),
+        ("أقصى RSS", 'peak_rss', _format_bytes),
+        ("ذروة tracemalloc", 'tracemalloc_peak', _format_bytes),
+    )
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self._page = None
+
+        self.historyTable = QTableWidget(0, len(self.COLUMNS))
+        self.historyTable.setHorizontalHeaderLabels(self.COLUMNS)
+        self.historyTable.setFont(QFont("Consolas", 10))
+        self.historyTable.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.historyTable.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.historyTable.verticalHeader().hide()
+        self.historyTable.itemSelectionChanged.connect(self._updateCompareButton)
+        self.compareBtn = QPushButton("مقارنة التشغيلين المحددين")
+        self.compareBtn.setEnabled(False)
+        self.compareBtn.clicked.connect(self.compareSelected)
+        self.clearBtn = QPushButton("مسح السجل")
+        self.clearBtn.clicked.connect(self.clearHistory)
+
+        self.compareTable = QTableWidget(0, 3)
+        self.compareTable.setFont(QFont("Consolas", 10))
+        self.compareTable.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.compareTable.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.outputA = QPlainTextEdit()
+        self.outputB = QPlainTextEdit()
+        for view in (self.outputA, self.outputB):
+            view.setReadOnly(True)
+            view.setFont(QFont("Consolas", 10))
+            view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        outputs = QSplitter(Qt.Orientation.Horizontal)
+        outputs.addWidget(self.outputA)
+        outputs.addWidget(self.outputB)
+        self.comparison = QSplitter(Qt.Orientation.Vertical)
+        self.comparison.addWidget(self.compareTable)
+        self.comparison.addWidget(outputs)
+        self.comparison.hide()
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.compareBtn)
+        buttons.addWidget(self.clearBtn)
+        buttons.addStretch(1)
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        splitter.addWidget(self.historyTable)
+        splitter.addWidget(self.comparison)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.addLayout(buttons)
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def showHistory(self, page):
+        if page is not self._page:
+            self.comparison.hide()
+        self._page = page
+        history = page.run_history if page else []
+        self.historyTable.setRowCount(len(history))
+        # الأحدث في الأعلى
+        for row, record in enumerate(reversed(history)):
+            if record['reason'] in ('', 'crashed'):
+                result = f"رمز {record['exit_code']}"
+            else:
+                result = {'stopped': "أُوقف", 'timeout': "انتهت المهلة", 'failed': "فشل البدء"}.get(record['reason'], record['reason'])
+            cpu = record['cpu']
+            values = (str(record['number']), record['time'], record['hash'], self.MODES.get(record['mode'], record['mode']),
+                      result, f"{record['wall']:.3f}", "—" if cpu is None else f"{cpu:.3f}",
+                      _format_bytes(record['peak_rss']), _format_bytes(record['tracemalloc_peak']))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setData(Qt.ItemDataRole.UserRole, record)
+                self.historyTable.setItem(row, column, item)
+        self.historyTable.resizeColumnsToContents()
+        self._updateCompareButton()
+
+    def clearHistory(self):
+        if self._page is not None:
+            self._page.run_history.clear()
+            self.comparison.hide()
+            self.showHistory(self._page)
+
+    def _selectedRecords(self):
+        rows = sorted({index.row() for index in self.historyTable.selectedIndexes()}, reverse=True)
+        return [self.historyTable.item(row, 0).data(Qt.ItemDataRole.UserRole) for row in rows]
+
+    def _updateCompareButton(self):
+        self.compareBtn.setEnabled(len(self._selectedRecords()) == 2)
+
+    def compareSelected(self):
+        records = self._selectedRecords()
+        if len(records) == 2:
+            self.compare(*records)
+
+    def compare(self, a, b):
+        # a الأقدم وb الأحدث؛ التغير سالب (أخضر) يعني أن b أسرع أو أخف
+        self.compareTable.clear()
+        self.compareTable.setHorizontalHeaderLabels((f"التشغيل {a['number']}", f"التشغيل {b['number']}", "التغير"))
+        rows = [("الوقت", a['time'], b['time'], ""),
+                ("بصمة الكود", a['hash'], b['hash'], "نفس الكود" if a['hash'] == b['hash'] else "تغيّر الكود"),
+                ("رمز الخروج", str(a['exit_code']), str(b['exit_code']), "")]
+        colors = {}
+        for title, key, fmt in self.METRICS:
+            old, new = a[key], b[key]
+            change = ""
+            if old is not None and new is not None and old > 0:
+                ratio = (new - old) / old
+                change = f"{ratio:+.1%}"
+                if abs(ratio) >= 0.01:
+                    colors[len(rows)] = QColor("#2e9d41") if ratio < 0 else QColor("#d23c3c")
+            rows.append((title, "—" if old is None else fmt(old), "—" if new is None else fmt(new), change))
+        self.compareTable.setRowCount(len(rows))
+        self.compareTable.setVerticalHeaderLabels([row[0] for row in rows])
+        for row, (_, *values) in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 2 and row in colors:
+                    item.setForeground(colors[row])
+                self.compareTable.setItem(row, column, item)
+        self.outputA.setPlainText(a['output'])
+        self.outputB.setPlainText(b['output'])
+        self.comparison.show()
 
 class AdvancedEditorTab(QMainWindow):
+    # (on_done, النتيجة أو الاستثناء) لعمل انتهى في مجمع العمليات
+    workerFinished = pyqtSignal(object, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("محرر نصوص متقدم - الإصدار الذهبي 🏆")
         self.setGeometry(100, 100, 1280, 860)
 
         self.is_dark_mode = True
-        self.search_positions = []
         self.search_index = -1
+        self.search_match_limit = SEARCH_MATCH_LIMIT
+        self.search_time_budget = SEARCH_TIME_BUDGET
+        self._search_forward = True
+        self._search_inclusive = False
+        # نتائج تحليل المكتبات حسب بصمة المحتوى ومجلد الملف
+        self._import_analysis_cache = {}
+        self._dependency_scan = None
+        self.run_timeout = RUN_TIMEOUT_SECONDS
+        self.trace_memory = False
+        self.interpreter_pool = InterpreterPool(self)
+        self.workerFinished.connect(lambda on_done, result: on_done(result))
         
         self.createWidgets()
         self.createToolbars()
@@ -413,7 +3454,13 @@ class AdvancedEditorTab(QMainWindow):
         self.searchEntry = QLineEdit()
         self.searchEntry.setPlaceholderText("ابحث هنا...")
         self.searchEntry.setMinimumWidth(150)
-        self.searchEntry.returnPressed.connect(self.performSearch)
+        self.searchEntry.returnPressed.connect(self.nextResult)
+        # البحث أثناء الكتابة: المؤقت يجمع الضغطات المتتالية في بحث واحد
+        self._live_search_timer = QTimer(self)
+        self._live_search_timer.setSingleShot(True)
+        self._live_search_timer.setInterval(LIVE_SEARCH_DELAY_MS)
+        self._live_search_timer.timeout.connect(self.liveSearch)
+        self.searchEntry.textChanged.connect(self._live_search_timer.start)
 
         self.replaceLabel = QLabel("استبدال:")
         self.replaceEntry = QLineEdit()
@@ -429,6 +3476,7 @@ class AdvancedEditorTab(QMainWindow):
 
         self.caseSensitiveCheck = QCheckBox("حساس لحالة الأحرف")
         self.wholeWordCheck = QCheckBox("كلمة كاملة")
+        self.regexCheck = QCheckBox("تعبير نمطي")
 
         searchLayout.addWidget(self.searchLabel)
         searchLayout.addWidget(self.searchEntry)
@@ -437,6 +3485,7 @@ class AdvancedEditorTab(QMainWindow):
         searchLayout.addWidget(self.findNextBtn)
         searchLayout.addWidget(self.caseSensitiveCheck)
         searchLayout.addWidget(self.wholeWordCheck)
+        searchLayout.addWidget(self.regexCheck)
         searchLayout.addStretch(1)
         searchLayout.addWidget(self.replaceLabel)
         searchLayout.addWidget(self.replaceEntry)
@@ -455,14 +3504,36 @@ class AdvancedEditorTab(QMainWindow):
         centralWidget.setLayout(layout)
         self.setCentralWidget(centralWidget)
 
+        self.findInFilesPanel = FindInFilesPanel(self)
+        self.findInFilesDock = QDockWidget("بحث في الملفات", self)
+        self.findInFilesDock.setWidget(self.findInFilesPanel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.findInFilesDock)
+        self.findInFilesDock.hide()
+
+        self.profilePanel = ProfilePanel(self)
+        self.profileDock = QDockWidget("المحلل", self)
+        self.profileDock.setWidget(self.profilePanel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.profileDock)
+        self.tabifyDockWidget(self.findInFilesDock, self.profileDock)
+        self.profileDock.hide()
+
+        self.runHistoryPanel = RunHistoryPanel(self)
+        self.runHistoryDock = QDockWidget("سجل التشغيل", self)
+        self.runHistoryDock.setWidget(self.runHistoryPanel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.runHistoryDock)
+        self.tabifyDockWidget(self.profileDock, self.runHistoryDock)
+        self.runHistoryDock.hide()
+
         self.findBtn.clicked.connect(lambda: self.performSearch(search_forward=True))
         self.findNextBtn.clicked.connect(self.nextResult)
         self.findPrevBtn.clicked.connect(self.prevResult)
         self.replaceBtn.clicked.connect(self.replaceOne)
         self.replaceAllBtn.clicked.connect(self.replaceAll)
         self.cancelSearchBtn.clicked.connect(lambda: (self.clearSearchHighlight(), self.searchBar.hide(), self.active_editor_page().textEdit.setFocus() if self.active_editor_page() else None))
-        self.caseSensitiveCheck.stateChanged.connect(lambda: self.performSearch(search_forward=True) if self.searchEntry.text() else None)
-        self.wholeWordCheck.stateChanged.connect(lambda: self.performSearch(search_forward=True) if self.searchEntry.text() else None)
+        self.caseSensitiveCheck.stateChanged.connect(lambda: self.liveSearch() if self.searchEntry.text() else None)
+        self.wholeWordCheck.stateChanged.connect(lambda: self.liveSearch() if self.searchEntry.text() else None)
+        self.regexCheck.stateChanged.connect(lambda: self.liveSearch() if self.searchEntry.text() else None)
+        self.regexCheck.toggled.connect(lambda: self._start_regex_workers())
 
     def createToolbars(self):
         self.toolbar = QToolBar("أدوات رئيسية")
@@ -483,10 +3554,22 @@ class AdvancedEditorTab(QMainWindow):
             ("📥", "Ctrl+V", self.paste),
             ("---", "", None),
             ("🔍", "Ctrl+F", self.toggleSearchBar),
+            ("🔍📁", "Ctrl+Shift+F", self.toggleFindInFiles),
             ("#", "Ctrl+/", self.toggleComment),
+            ("⇥", "Ctrl+]", self.indentSelection),
+            ("⇤", "Ctrl+[", self.dedentSelection),
             ("▶️💻", "F5", self.runCode),
+            ("▶️⏱️", "Ctrl+F5", self.runWithProfiler),
+            ("▶️🌡️", "", self.runWithLineTiming),
+            ("▶️⏲️", "", self.runBenchmark),
+            ("⏹️", "Shift+F5", self.stopCode),
+            ("📈", "", self.toggleRunHistory),
+            ("▶️%%", "Ctrl+Return", self.runCell),
+            ("⏸️", "Ctrl+Alt+C", self.interruptKernel),
+            ("🔄", "Ctrl+Alt+R", self.restartKernel),
             ("---", "", None),
             ("📚📊", "", self.analyzeImports),
+            ("📚📁", "", self.scanProjectDependencies),
             ("---", "", None),
             ("🗑️", "", self.clearContent),
             ("🗑️ثم📥", "", self.clearAndPaste),
@@ -565,10 +3648,17 @@ class AdvancedEditorTab(QMainWindow):
         self.lineColLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.statusBar.addPermanentWidget(self.lineColLabel)
 
+        self.relexLabel = QLabel("")
+        self.relexLabel.setToolTip("عدد الأسطر التي أعيد تحليلها للتلوين بعد آخر تعديل")
+        self.statusBar.addPermanentWidget(self.relexLabel)
+
     def updateStatusBar(self, message, timeout=4000):
         self.statusLabel.setText(message)
         self.statusBar.showMessage(message, timeout)
 
+    def updateRelexStatus(self, count):
+        self.relexLabel.setText(f"أسطر أعيد تحليلها: {count}")
+
     def updateLineColStatus(self):
         page = self.active_editor_page()
         if page:
@@ -594,7 +3684,7 @@ class AdvancedEditorTab(QMainWindow):
         file_menu.addAction(exit_action)
 
         edit_menu = self.menuBar().addMenu("تحرير")
-        edit_actions_texts = ["تراجع", "إعادة", "✂️", "📋", "📥", "🔍", "#", "🗑️"]
+        edit_actions_texts = ["تراجع", "إعادة", "✂️", "📋", "📥", "🔍", "🔍📁", "#", "⇥", "⇤", "🗑️"]
         edit_actions = [a for a in self.toolbar.actions() if a.text() in edit_actions_texts]
         for action in edit_actions:
             edit_menu.addAction(action)
@@ -612,10 +3702,25 @@ class AdvancedEditorTab(QMainWindow):
             view_menu.addAction(theme_action)
             
         run_menu = self.menuBar().addMenu("تشغيل")
-        run_actions_texts = ["▶️💻", "📚📊"]
+        run_actions_texts = ["▶️💻", "▶️⏱️", "▶️🌡️", "▶️⏲️", "⏹️", "📈", "▶️%%", "⏸️", "🔄", "📚📊", "📚📁"]
         run_actions = [a for a in self.toolbar.actions() if a.text() in run_actions_texts]
         for action in run_actions:
             run_menu.addAction(action)
+        run_menu.addSeparator()
+        timeout_action = QAction("مهلة التشغيل...", self)
+        timeout_action.triggered.connect(self.setRunTimeout)
+        run_menu.addAction(timeout_action)
+        clear_heat_action = QAction("مسح توقيت الأسطر", self)
+        clear_heat_action.triggered.connect(lambda: self.active_editor_page().textEdit.setLineHeat({}) if self.active_editor_page() else None)
+        run_menu.addAction(clear_heat_action)
+        trace_memory_action = QAction("قياس ذروة الذاكرة بـ tracemalloc", self)
+        trace_memory_action.setCheckable(True)
+        trace_memory_action.setChecked(self.trace_memory)
+        trace_memory_action.toggled.connect(lambda checked: setattr(self, 'trace_memory', checked))
+        run_menu.addAction(trace_memory_action)
+        warm_action = QAction("تسخين المفسر...", self)
+        warm_action.triggered.connect(self.configureWarmInterpreters)
+        run_menu.addAction(warm_action)
 
     def setupShortcuts(self):
         shortcuts = [
@@ -636,18 +3741,19 @@ class AdvancedEditorTab(QMainWindow):
         if not page: return
 
         if checked:
-            page.outputConsole.show()
+            page.outputPanel.show()
             self.toggle_output_action.setText("إخفاء الإخراج")
             self.updateStatusBar("تم إظهار منطقة الإخراج.")
         else:
-            page.outputConsole.hide()
+            page.outputPanel.hide()
             self.toggle_output_action.setText("إظهار الإخراج")
             self.updateStatusBar("تم إخفاء منطقة الإخراج.")
 
     def toggleTheme(self):
         self.is_dark_mode = not self.is_dark_mode
         self.applyTheme()
-        if self.search_positions:
+        page = self.active_editor_page()
+        if page and page.textEdit.searchIndex.pattern is not None:
             self.highlightSearchResults()
 
     def applyTheme(self):
@@ -754,17 +3860,40 @@ greet("User")
         page.textEdit.customContextMenuRequested.connect(self.showTextContextMenu)
         page.outputConsole.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         page.outputConsole.customContextMenuRequested.connect(self.showOutputContextMenu)
+        page.outputConsole.keep_spill = self._claimSpill
         
         return page
 
+    def _claimSpill(self, path):
+        # الملف الجانبي المفتوح في لسان تبويب لا يُحذف مع مسح الطرفية؛ يحذفه إغلاق ذلك اللسان
+        target = os.path.normcase(os.path.abspath(path))
+        for i in range(self.tab_widget.count()):
+            page = self.tab_widget.widget(i)
+            if page.current_file and os.path.normcase(os.path.abspath(page.current_file)) == target:
+                page.spill_file = path
+                return True
+        return False
+
+    def _teardownPage(self, page):
+        # المشغل يتوقف أولاً ويُكتب ما بقي من إخراجه، ثم يُحذف الملف الجانبي
+        # فلا ينشئ إخراج متأخر ملفاً جديداً لا يحذفه أحد
+        page.runner.shutdown()
+        page.kernel.shutdown()
+        page.outputConsole.flush(partial=True)
+        page.outputConsole.discardSpill()
+        if page.spill_file is not None:
+            try: os.remove(page.spill_file)
+            except OSError as e: print(f"Warning: Could not delete spill file {page.spill_file}: {e}", file=sys.stderr)
+
     def on_tab_changed(self, index):
         self.updateLineColStatus()
         page = self.active_editor_page()
         if page:
-            output_visible = not page.outputConsole.isHidden()
+            output_visible = not page.outputPanel.isHidden()
             self.toggle_output_action.setChecked(output_visible)
             self.toggle_output_action.setText("إخفاء الإخراج" if output_visible else "إظهار الإخراج")
         self.clearSearchHighlight(show_message=False)
+        self.runHistoryPanel.showHistory(page)
 
     def close_tab(self, index):
         page = self.tab_widget.widget(index)
@@ -783,6 +3912,7 @@ greet("User")
             elif reply == QMessageBox.StandardButton.Cancel:
                 return
         
+        self._teardownPage(page)
         self.tab_widget.removeTab(index)
         if self.tab_widget.count() == 0:
             self.close()
@@ -803,7 +3933,9 @@ greet("User")
             output_palette.setColor(QPalette.ColorRole.Text, QColor(50, 50, 50))
             
         page.outputConsole.setPalette(output_palette)
-        page.highlighter.rehighlight()
+        page.outputConsole.set_dark_mode(self.is_dark_mode)
+        page.highlighter.setTheme('dark' if self.is_dark_mode else 'light')
+        page.highlight_viewport()
         page.textEdit.lineNumberArea.update()
         page.textEdit.highlightCurrentLine()
 
@@ -818,27 +3950,42 @@ greet("User")
                         self.tab_widget.setCurrentIndex(i)
                         return
 
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    page = self.new_tab()
-                    page.textEdit.blockSignals(True)
-                    page.textEdit.setPlainText(content)
-                    page.textEdit.blockSignals(False)
-                    page.current_file = filepath
-                    page.textEdit.document().setModified(False)
-                    
-                    self.update_current_tab_title()
-                    self.updateStatusBar(f"تم فتح الملف: {os.path.basename(filepath)}")
-                    page.textEdit.moveCursor(QTextCursor.MoveOperation.Start)
-                    page.textEdit.ensureCursorVisible()
-                    page.textEdit.updateLineNumberAreaWidth()
-                    page.outputConsole.clear()
-
-                except Exception as e:
-                    QMessageBox.critical(self, "خطأ", f"لا يمكن فتح الملف:\n{e}")
-                    self.updateStatusBar(f"فشل فتح الملف: {os.path.basename(filepath)}")
+                self._openInNewTab(filepath)
+
+    def openPath(self, filepath):
+        # لسان التبويب المفتوح على filepath، أو لسان جديد له
+        target = os.path.normcase(os.path.abspath(filepath))
+        for i in range(self.tab_widget.count()):
+            page = self.tab_widget.widget(i)
+            if page.current_file and os.path.normcase(os.path.abspath(page.current_file)) == target:
+                self.tab_widget.setCurrentIndex(i)
+                return page
+        return self._openInNewTab(filepath)
+
+    def _openInNewTab(self, filepath):
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            page = self.new_tab()
+            page.textEdit.blockSignals(True)
+            page.load_text(content)
+            page.textEdit.blockSignals(False)
+            page.current_file = filepath
+            page.textEdit.document().setModified(False)
+            
+            self.update_current_tab_title()
+            self.updateStatusBar(f"تم فتح الملف: {os.path.basename(filepath)}")
+            page.textEdit.moveCursor(QTextCursor.MoveOperation.Start)
+            page.textEdit.ensureCursorVisible()
+            page.textEdit.updateLineNumberAreaWidth()
+            page.outputConsole.clear()
+            return page
+
+        except Exception as e:
+            QMessageBox.critical(self, "خطأ", f"لا يمكن فتح الملف:\n{e}")
+            self.updateStatusBar(f"فشل فتح الملف: {os.path.basename(filepath)}")
+            return None
 
     def saveFile(self):
         page = self.active_editor_page()
@@ -975,6 +4122,18 @@ greet("User")
         self.clearAndPaste()
         QTimer.singleShot(300, lambda: self.saveRandomFile(".py"))
 
+    def toggleFindInFiles(self):
+        if self.findInFilesDock.isVisible():
+            self.findInFilesPanel.stopSearch()
+            self.findInFilesDock.hide()
+            return
+        self.findInFilesDock.show()
+        page = self.active_editor_page()
+        if page and page.textEdit.textCursor().hasSelection():
+            self.findInFilesPanel.queryEntry.setText(page.textEdit.textCursor().selectedText())
+        self.findInFilesPanel.queryEntry.setFocus()
+        self.findInFilesPanel.queryEntry.selectAll()
+
     def toggleSearchBar(self):
         if not self.active_editor_page(): return
         if self.searchBar.isVisible():
@@ -985,87 +4144,128 @@ greet("User")
             self.searchBar.show()
             self.searchEntry.setFocus()
             self.searchEntry.selectAll()
+            self._start_regex_workers()
             if self.searchEntry.text():
-                self.performSearch()
+                self.performSearch(background=True)
+
+    def _start_regex_workers(self):
+        # عمليات التعبير النمطي تبدأ مسبقاً فلا ينتظر أول بحث زمن بدئها
+        if self.regexCheck.isChecked():
+            for name in ('foreground', 'background'):
+                _get_isolated_worker(name).start()
 
-    def _get_find_flags(self):
-        find_flags = QTextDocument.FindFlag(0)
-        if self.caseSensitiveCheck.isChecked():
-            find_flags |= QTextDocument.FindFlag.FindCaseSensitively
-        if self.wholeWordCheck.isChecked():
-            find_flags |= QTextDocument.FindFlag.FindWholeWords
-        return find_flags
+    def _build_search_pattern(self, query):
+        return compile_search_pattern(query, self.regexCheck.isChecked(),
+                                      self.caseSensitiveCheck.isChecked(), self.wholeWordCheck.isChecked())
 
-    def performSearch(self, search_forward=True):
+    def _replacement_for(self, page, start, end):
+        # في وضع التعبير النمطي تُوسَّع مراجع المجموعات (\1 و \g<name>) من النتيجة نفسها،
+        # مطابَقةً على نص المستند كله لأن النتيجة قد تمتد عبر الأسطر؛ None إن لم تتطابق
+        replacement = self.replaceEntry.text()
+        if not self.regexCheck.isChecked():
+            return replacement
+        results = page.textEdit.searchIndex
+        text = results.snapshot()
+        index = _python_index(text, start)
+        match = results.pattern.match(text, index)
+        if match is None or start + _utf16_offset(text[index:match.end()], match.end() - index) != end:
+            return None
+        return match.expand(replacement)
+
+    def _select_adjacent_result(self, page, search_forward=True, inclusive=False, wrap=True):
+        # بحث ثنائي في الفهرس انطلاقاً من المؤشر، مع الالتفاف عند الطرفين
+        results = page.textEdit.searchIndex
+        cursor = page.textEdit.textCursor()
+        point = cursor.selectionStart()
+        if search_forward:
+            index = results.indexAtOrAfter(point + (1 if cursor.hasSelection() and not inclusive else 0))
+            if index >= len(results):
+                index = 0
+                if not wrap: return False
+        else:
+            index = results.indexBefore(point)
+            if index < 0:
+                index = len(results) - 1
+                if not wrap: return False
+        self.search_index = index
+        return True
+
+    def _show_search_position(self, query):
+        results = self.active_editor_page().textEdit.searchIndex
+        if self.search_index >= 0:
+            message = f"نتيجة {self.search_index + 1} من {len(results)} لكلمة '{query}'"
+        else:
+            message = f"{len(results)} نتيجة لكلمة '{query}'"
+        if results.searching:
+            message += " (جارٍ البحث...)"
+        elif not results.complete:
+            message += " (توقف البحث قبل نهاية الملف)"
+        self.updateStatusBar(message, timeout=0)
+
+    def liveSearch(self):
+        if not self.searchBar.isVisible(): return
+        if self.searchEntry.text():
+            # البحث أثناء الكتابة في الخلفية دائماً؛ Enter والتالي/السابق تبحث فوراً
+            self.performSearch(search_forward=True, inclusive=True, background=True)
+        else:
+            self.clearSearchHighlight()
+
+    def performSearch(self, search_forward=True, inclusive=False, background=False):
         page = self.active_editor_page()
         if not page: return
+        self._live_search_timer.stop()
         query = self.searchEntry.text()
         if not query:
             self.clearSearchHighlight()
             return
 
-        document = page.textEdit.document()
-        cursor = page.textEdit.textCursor()
-        find_flags = self._get_find_flags()
-
-        self.search_positions = []
-        search_cursor = QTextCursor(document)
-        while True:
-            search_cursor = document.find(query, search_cursor, find_flags)
-            if search_cursor.isNull():
-                break
-            self.search_positions.append((search_cursor.selectionStart(), search_cursor.selectionEnd()))
-
-        if not self.search_positions:
-            self.updateStatusBar(f"لم يتم العثور على '{query}'")
+        try:
+            pattern = self._build_search_pattern(query)
+        except re.error as e:
+            self.updateStatusBar(f"تعبير نمطي غير صالح: {e}")
             self.clearSearchHighlight(show_message=False)
-            self.search_index = -1
             return
 
-        current_pos = cursor.position()
-        current_sel_start = cursor.selectionStart()
+        results = page.textEdit.searchIndex
+        self.search_index = -1
+        self._search_forward = search_forward
+        self._search_inclusive = inclusive
+        if background or page.textEdit.document().characterCount() >= OFFTHREAD_SEARCH_MIN_CHARS:
+            # النتائج تصل على دفعات إلى showSearchResults
+            results.searchInBackground(pattern, self.search_match_limit, self.search_time_budget)
+            self._show_search_position(query)
+            return
+        results.setPattern(pattern, self.search_match_limit, self.search_time_budget)
+        self.showSearchResults(done=True)
 
-        new_search_index = -1
+    def showSearchResults(self, done):
+        page = self.active_editor_page()
+        if not page: return
+        query = self.searchEntry.text()
+        results = page.textEdit.searchIndex
+
+        if not len(results):
+            if not done:
+                self._show_search_position(query)
+            elif results.complete:
+                self.updateStatusBar(f"لم يتم العثور على '{query}'")
+                self.clearSearchHighlight(show_message=False)
+            else:
+                self.updateStatusBar(f"لم يتم العثور على '{query}' (توقف البحث قبل نهاية الملف)")
+                self.clearSearchHighlight(show_message=False)
+            return
 
-        if search_forward:
-            search_start_point = current_sel_start if cursor.hasSelection() else current_pos
-            found_after = False
-            for i, (start, end) in enumerate(self.search_positions):
-                if start >= search_start_point + (1 if cursor.hasSelection() and start == search_start_point else 0):
-                    new_search_index = i
-                    found_after = True
-                    break
-            if not found_after and self.search_positions:
-                new_search_index = 0
+        # أول نتيجة بعد المؤشر تُحدَّد فور وصولها؛ الالتفاف ينتظر اكتمال البحث
+        if self.search_index < 0 and self._select_adjacent_result(
+                page, self._search_forward, self._search_inclusive, wrap=done):
+            self.gotoSearchResult()
         else:
-            search_end_point = current_sel_start if cursor.hasSelection() else current_pos
-            found_before = False
-            for i in range(len(self.search_positions) - 1, -1, -1):
-                start, end = self.search_positions[i]
-                if end <= search_end_point:
-                    new_search_index = i
-                    found_before = True
-                    break
-            if not found_before and self.search_positions:
-                 new_search_index = len(self.search_positions) - 1
-
-        self.search_index = new_search_index
-
-        self.highlightSearchResults()
-        self.gotoSearchResult()
-        if self.search_positions and self.search_index != -1:
-             self.updateStatusBar(f"نتيجة {self.search_index + 1} من {len(self.search_positions)} لكلمة '{query}'", timeout=0)
-        elif self.search_positions:
-             self.updateStatusBar(f"تم العثور على {len(self.search_positions)} نتائج لكلمة '{query}', تحديد المؤشر...", timeout=0)
+            self.highlightSearchResults()
+        self._show_search_position(query)
 
     def highlightSearchResults(self):
         page = self.active_editor_page()
         if not page: return
-        page.textEdit.highlightCurrentLine() 
-        extraSelections = page.textEdit.extraSelections()
-
-        if not self.search_positions:
-            return
 
         highlight_format = QTextCharFormat()
         current_highlight_format = QTextCharFormat()
@@ -1078,28 +4278,16 @@ greet("User")
             current_highlight_color = QColor('#FFD700')
 
         highlight_format.setBackground(highlight_color)
-        highlight_format.setProperty(QTextCharFormat.Property.UserProperty, "search_highlight")
-
         current_highlight_format.setBackground(current_highlight_color)
-        current_highlight_format.setProperty(QTextCharFormat.Property.UserProperty, "search_highlight")
-        
-        doc = page.textEdit.document()
-        for i, (start, end) in enumerate(self.search_positions):
-            selection = QTextEdit.ExtraSelection()
-            selection.format = current_highlight_format if i == self.search_index else highlight_format
-            selection.cursor = QTextCursor(doc)
-            selection.cursor.setPosition(start)
-            selection.cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
-            extraSelections.append(selection)
 
-        page.textEdit.setExtraSelections(extraSelections)
+        page.textEdit.setSearchResults(self.search_index, highlight_format, current_highlight_format)
 
     def gotoSearchResult(self):
         page = self.active_editor_page()
-        if not page or not self.search_positions or not (0 <= self.search_index < len(self.search_positions)):
+        if not page or not (0 <= self.search_index < len(page.textEdit.searchIndex)):
             return
 
-        start, end = self.search_positions[self.search_index]
+        start, end = page.textEdit.searchIndex.match(self.search_index)
         cursor = page.textEdit.textCursor()
         cursor.setPosition(start)
         cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
@@ -1109,32 +4297,31 @@ greet("User")
         self.highlightSearchResults()
 
     def nextResult(self):
-        if not self.active_editor_page(): return
-        if not self.searchEntry.text(): return
+        self._step_result(search_forward=True)
 
-        if not self.search_positions:
-            self.performSearch(search_forward=True)
-            return
+    def prevResult(self):
+        self._step_result(search_forward=False)
 
-        if self.search_positions:
-            self.search_index = (self.search_index + 1) % len(self.search_positions)
-            self.gotoSearchResult()
-            query = self.searchEntry.text()
-            self.updateStatusBar(f"نتيجة {self.search_index + 1} من {len(self.search_positions)} لكلمة '{query}'", timeout=0)
+    def _step_result(self, search_forward):
+        page = self.active_editor_page()
+        if not page: return
+        query = self.searchEntry.text()
+        if not query: return
 
-    def prevResult(self):
-        if not self.active_editor_page(): return
-        if not self.searchEntry.text(): return
-        
-        if not self.search_positions:
-            self.performSearch(search_forward=False)
+        results = page.textEdit.searchIndex
+        try:
+            stale = results.pattern is not self._build_search_pattern(query)
+        except re.error:
+            stale = True
+        if stale or self._live_search_timer.isActive() or not (len(results) or results.searching):
+            self.performSearch(search_forward=search_forward)
+            return
+        if not len(results):
             return
 
-        if self.search_positions:
-            self.search_index = (self.search_index - 1 + len(self.search_positions)) % len(self.search_positions)
-            self.gotoSearchResult()
-            query = self.searchEntry.text()
-            self.updateStatusBar(f"نتيجة {self.search_index + 1} من {len(self.search_positions)} لكلمة '{query}'", timeout=0)
+        self._select_adjacent_result(page, search_forward)
+        self.gotoSearchResult()
+        self._show_search_position(query)
 
     def replaceOne(self):
         page = self.active_editor_page()
@@ -1147,39 +4334,35 @@ greet("User")
             return
 
         cursor = page.textEdit.textCursor()
-        find_flags = self._get_find_flags()
-
-        is_current_search_result_selected = False
-        if cursor.hasSelection() and 0 <= self.search_index < len(self.search_positions):
-            current_start, current_end = self.search_positions[self.search_index]
-            text_to_compare = cursor.selectedText()
-            query_to_compare = query
-            if not (find_flags & QTextDocument.FindFlag.FindCaseSensitively):
-                 text_to_compare = text_to_compare.lower()
-                 query_to_compare = query_to_compare.lower()
-
-            if (cursor.selectionStart() == current_start and
-                cursor.selectionEnd() == current_end and
-                text_to_compare == query_to_compare):
-                 is_current_search_result_selected = True
+        results = page.textEdit.searchIndex
+
+        is_current_search_result_selected = (
+            cursor.hasSelection() and results.pattern is not None
+            and 0 <= self.search_index < len(results)
+            and results.match(self.search_index) == (cursor.selectionStart(), cursor.selectionEnd()))
 
         if is_current_search_result_selected:
+            try:
+                replacement = self._replacement_for(page, cursor.selectionStart(), cursor.selectionEnd())
+            except re.error as e:
+                self.updateStatusBar(f"نص استبدال غير صالح: {e}")
+                return
+            if replacement is None:
+                self.updateStatusBar("تعذر توسيع نص الاستبدال لهذه النتيجة؛ أعد البحث")
+                return
+            # الفهرس يُحدَّث من contentsChange، فنكمل للنتيجة التالية دون بحث جديد
             cursor.insertText(replacement)
             self.updateStatusBar(f"تم استبدال '{query}' بـ '{replacement}'")
-            new_cursor_pos = cursor.position()
-            self.clearSearchHighlight(show_message=False)
-            QTimer.singleShot(0, lambda: self.performSearchFrom(new_cursor_pos))
+            page.textEdit.setTextCursor(cursor)
+            if not len(results):
+                self.clearSearchHighlight(show_message=False)
+                return
+            self._select_adjacent_result(page, search_forward=True)
+            self.gotoSearchResult()
+            self._show_search_position(query)
         else:
             self.nextResult()
 
-    def performSearchFrom(self, start_pos):
-        page = self.active_editor_page()
-        if not page: return
-        cursor = page.textEdit.textCursor()
-        cursor.setPosition(start_pos)
-        page.textEdit.setTextCursor(cursor)
-        self.performSearch(search_forward=True)
-
     def replaceAll(self):
         page = self.active_editor_page()
         if not page: return
@@ -1190,45 +4373,42 @@ greet("User")
             self.updateStatusBar("يرجى إدخال نص البحث أولاً")
             return
 
-        document = page.textEdit.document()
-        find_flags = self._get_find_flags()
-        count = 0
-
-        temp_positions = []
-        search_cursor = QTextCursor(document)
-        while True:
-            search_cursor = document.find(query, search_cursor, find_flags)
-            if search_cursor.isNull(): break
-            temp_positions.append((search_cursor.selectionStart(), search_cursor.selectionEnd()))
-
-        if not temp_positions:
-            self.updateStatusBar(f"لم يتم العثور على '{query}' للاستبدال")
-            self.clearSearchHighlight()
+        results = page.textEdit.searchIndex
+        try:
+            pattern = self._build_search_pattern(query)
+        except re.error as e:
+            self.updateStatusBar(f"تعبير نمطي غير صالح: {e}")
             return
+        regex = self.regexCheck.isChecked()
+        if regex and (results.pattern is not pattern or not results.complete):
+            # subn لا يمكن إيقافه، فيُجرَّب التعبير أولاً ضمن الحد الزمني
+            results.setPattern(pattern, None, self.search_time_budget)
+            if not results.complete:
+                self.clearSearchHighlight(show_message=False)
+                self.updateStatusBar("التعبير النمطي بطيء جداً على هذا الملف؛ لم يُستبدل شيء")
+                return
 
-        page.textEdit.textCursor().beginEditBlock()
-        cursor = QTextCursor(document)
+        # النص الجديد يُحسب بتمريرة واحدة على اللقطة المشتركة ثم يُطبَّق كتعديل واحد
+        text = results.snapshot()
+        template = replacement if regex else replacement.replace('\\', '\\\\')
         try:
-            for start, end in reversed(temp_positions):
-                cursor.setPosition(start)
-                cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
-                cursor.insertText(replacement)
-                count += 1
-        finally:
-             page.textEdit.textCursor().endEditBlock()
+            new_text, count = pattern.subn(template, text)
+        except re.error as e:
+            self.updateStatusBar(f"نص استبدال غير صالح: {e}")
+            return
 
-        if count > 0:
-            self.updateStatusBar(f"تم استبدال {count} نتيجة لكلمة '{query}'")
-            self.clearSearchHighlight()
-        else:
+        self.clearSearchHighlight(show_message=False)
+        if not count:
             self.updateStatusBar(f"لم يتم العثور على '{query}' للاستبدال")
-            self.clearSearchHighlight()
+            return
+
+        page.replace_text(new_text, text)
+        self.updateStatusBar(f"تم استبدال {count} نتيجة لكلمة '{query}'")
 
     def clearSearchHighlight(self, show_message=True):
         page = self.active_editor_page()
         if not page: return
-        page.textEdit.highlightCurrentLine() 
-        self.search_positions = []
+        page.textEdit.clearSearchResults()
         self.search_index = -1
 
         if show_message and self.statusBar.currentMessage().startswith("نتيجة"):
@@ -1237,73 +4417,17 @@ greet("User")
     def toggleComment(self):
         page = self.active_editor_page()
         if not page: return
-        
-        cursor = page.textEdit.textCursor()
-        start_pos = cursor.selectionStart()
-        end_pos = cursor.selectionEnd()
-        doc = page.textEdit.document()
-
-        cursor.beginEditBlock()
-
-        start_block = doc.findBlock(start_pos)
-        end_block = doc.findBlock(end_pos)
-
-        if not cursor.hasSelection() or cursor.atBlockEnd():
-             if start_pos != end_pos and doc.findBlock(end_pos).blockNumber() > start_block.blockNumber() and end_pos == doc.findBlock(end_pos).position():
-                 end_block = end_block.previous()
-        
-        mode = 'comment'
-        lines_to_process = []
-        only_commented_lines_found = True
-        has_code = False
+        page.transform_selected_lines(toggle_comment_lines)
 
-        block = start_block
-        while True:
-            line_text = block.text()
-            stripped_line = line_text.lstrip()
-            lines_to_process.append(block)
-            if stripped_line:
-                 has_code = True
-                 if not stripped_line.startswith('#'):
-                      only_commented_lines_found = False
-            if block == end_block:
-                break
-            block = block.next()
-        
-        if has_code and only_commented_lines_found:
-             mode = 'uncomment'
-        
-        if mode == 'comment':
-             min_indent = float('inf')
-             for block in lines_to_process:
-                  line_text = block.text()
-                  stripped_line = line_text.lstrip()
-                  if stripped_line:
-                      indent = len(line_text) - len(stripped_line)
-                      min_indent = min(min_indent, indent)
-             if min_indent == float('inf'): min_indent = 0
-
-             for block in lines_to_process:
-                  mod_cursor = QTextCursor(block)
-                  mod_cursor.setPosition(block.position() + min_indent)
-                  mod_cursor.insertText("# ")
-
-        elif mode == 'uncomment':
-             for block in lines_to_process:
-                  line_text = block.text()
-                  stripped_line = line_text.lstrip()
-                  if stripped_line.startswith('#'):
-                      mod_cursor = QTextCursor(block)
-                      indent = len(line_text) - len(stripped_line)
-                      mod_cursor.setPosition(block.position() + indent)
-                      if stripped_line.startswith('# '):
-                          mod_cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor, 2)
-                      else:
-                          mod_cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor, 1)
-                      mod_cursor.removeSelectedText()
+    def indentSelection(self):
+        page = self.active_editor_page()
+        if not page: return
+        page.transform_selected_lines(indent_lines)
 
-        cursor.endEditBlock()
-        page.textEdit.ensureCursorVisible()
+    def dedentSelection(self):
+        page = self.active_editor_page()
+        if not page: return
+        page.transform_selected_lines(dedent_lines)
 
     def analyzeImports(self):
         page = self.active_editor_page()
@@ -1311,128 +4435,342 @@ greet("User")
             self.updateStatusBar("لا يوجد لسان تبويب نشط لتحليله.")
             return
 
-        code = page.textEdit.toPlainText()
+        code = page.textEdit.searchIndex.snapshot()
         if not code.strip():
             QMessageBox.information(self, "📦 المكتبات المستوردة", "المحرر فارغ. لا توجد مكتبات لتحليلها.")
             return
 
-        lines = code.splitlines()
-        libraries = set()
-        import_pattern = re.compile(r'^\s*(import|from)\s+([a-zA-Z0-9_\.]+)')
+        directory = os.path.dirname(os.path.abspath(page.current_file)) if page.current_file else None
+        key = (hashlib.sha1(code.encode('utf-8', 'surrogatepass')).hexdigest(), directory)
+        cached = self._import_analysis_cache.get(key)
+        if cached is not None:
+            self._showImportAnalysis(key, cached)
+            return
 
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line or stripped_line.startswith('#'):
-                continue
+        # التحليل (ast والبحث عن الحزم المثبتة) في عملية عاملة
+        self.updateStatusBar("جارٍ تحليل المكتبات المستوردة...")
+        self._runInWorker(lambda result: self._showImportAnalysis(key, result), analyze_imports, code, directory)
 
-            match = import_pattern.match(line)
-            if match:
-                lib_path = match.group(2)
-                if lib_path.startswith('.'):
-                    continue
-                base_lib = lib_path.split('.')[0]
-                libraries.add(base_lib)
+    def _runInWorker(self, on_done, fn, *args):
+        future = _get_worker_pool().submit(fn, *args)
+        _deliver_result(future, self.workerFinished, on_done)
 
-        if libraries:
-            libs_list = sorted(libraries)
-            libs_text = "\n".join(libs_list)
-            
-            reply = QMessageBox.question(
-                self,
-                "📦 المكتبات المستوردة",
-                libs_text + "\n\nهل تريد نسخها إلى الحافظة بتنسيق 'pip install ...'؟",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            
-            if reply == QMessageBox.StandardButton.Yes:
-                pip_command = f"pip install {' '.join(libs_list)}"
-                clipboard = QApplication.clipboard()
-                clipboard.setText(pip_command)
-                QMessageBox.information(self, "✅ تم النسخ", "تم نسخ الأمر إلى الحافظة:\n" + pip_command)
-                self.updateStatusBar("تم نسخ أمر تثبيت المكتبات إلى الحافظة.")
-        else:
+    def _showImportAnalysis(self, key, result):
+        if isinstance(result, Exception):
+            result = {'error': str(result)}
+        if 'error' in result:
+            QMessageBox.warning(self, "📦 المكتبات المستوردة", f"تعذر تحليل الكود:\n{result['error']}")
+            self.updateStatusBar("فشل تحليل المكتبات.")
+            return
+        cache = self._import_analysis_cache
+        cache.pop(key, None)
+        cache[key] = result
+        if len(cache) > IMPORT_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+
+        installed = [name if name == dist else f"{name} ({dist})" for name, dist in result['installed'].items()]
+        missing = result['missing']
+        sections = [
+            ("المكتبة القياسية", result['stdlib']),
+            ("وحدات محلية", result['local']),
+            ("مثبتة", installed),
+            ("غير مثبتة", [name if name == pip else f"{name} ← {pip}" for name, pip in missing.items()]),
+        ]
+        libs_text = "\n\n".join(f"{title}:\n" + "\n".join(names) for title, names in sections if names)
+        if not libs_text:
             QMessageBox.information(self, "📦 المكتبات المستوردة", "❌ لم يتم العثور على مكتبات.")
             self.updateStatusBar("لم يتم العثور على مكتبات في التحليل.")
+            return
+
+        if not missing:
+            QMessageBox.information(self, "📦 المكتبات المستوردة", libs_text + "\n\n✅ كل المكتبات متوفرة.")
+            self.updateStatusBar("كل المكتبات المستوردة متوفرة.")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "📦 المكتبات المستوردة",
+            libs_text + "\n\nهل تريد نسخ المكتبات الناقصة إلى الحافظة بتنسيق 'pip install ...'؟",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+
+        if reply == QMessageBox.StandardButton.Yes:
+            pip_command = f"pip install {' '.join(sorted(set(missing.values())))}"
+            clipboard = QApplication.clipboard()
+            clipboard.setText(pip_command)
+            QMessageBox.information(self, "✅ تم النسخ", "تم نسخ الأمر إلى الحافظة:\n" + pip_command)
+            self.updateStatusBar("تم نسخ أمر تثبيت المكتبات إلى الحافظة.")
+
+    def scanProjectDependencies(self):
+        if self._dependency_scan is not None:
+            self.updateStatusBar("فحص مكتبات المشروع جارٍ بالفعل...")
+            return
+        page = self.active_editor_page()
+        start_dir = os.path.dirname(page.current_file) if page and page.current_file else os.getcwd()
+        root = QFileDialog.getExistingDirectory(self, "اختر مجلد المشروع", start_dir)
+        if not root:
+            return
+        self._dependency_scan = {'root': root, 'started': time.perf_counter(), 'pending': 0, 'parsed': 0}
+        self.updateStatusBar("جارٍ فحص مكتبات المشروع...", timeout=0)
+        self._runInWorker(self._onDependencyPlan, plan_dependency_scan, root)
+
+    def _onDependencyPlan(self, result):
+        scan = self._dependency_scan
+        if isinstance(result, Exception):
+            self._dependency_scan = None
+            self.updateStatusBar(f"فشل فحص المشروع: {result}")
+            return
+        scan['entries'], stale, scan['changed'] = result
+        # الملفات المعدلة وحدها تُحلَّل، على دفعات موزعة على عمليات المجمع
+        for i in range(0, len(stale), DEPENDENCY_SCAN_BATCH):
+            scan['pending'] += 1
+            self._runInWorker(self._onDependencyBatch, scan_import_files, stale[i:i + DEPENDENCY_SCAN_BATCH])
+        if not scan['pending']:
+            self._finishDependencyScan()
+
+    def _onDependencyBatch(self, result):
+        scan = self._dependency_scan
+        scan['pending'] -= 1
+        if not isinstance(result, Exception):
+            scan['entries'].update(result)
+            scan['parsed'] += len(result)
+        if not scan['pending']:
+            self._finishDependencyScan()
+
+    def _finishDependencyScan(self):
+        scan = self._dependency_scan
+        self._runInWorker(self._showRequirements, finish_dependency_scan,
+                          scan['root'], scan['entries'], scan['changed'])
+
+    def _showRequirements(self, result):
+        scan, self._dependency_scan = self._dependency_scan, None
+        if isinstance(result, Exception):
+            self.updateStatusBar(f"فشل فحص المشروع: {result}")
+            return
+        text, classification = result
+        page = self.new_tab()
+        page.textEdit.setPlainText(text)
+        page.textEdit.document().setModified(False)
+        self.tab_widget.setTabText(self.tab_widget.currentIndex(), "requirements.txt")
+        elapsed = time.perf_counter() - scan['started']
+        self.updateStatusBar(
+            f"تم فحص {len(scan['entries'])} ملف ({scan['parsed']} أعيد تحليلها) في {elapsed:.2f} ث — "
+            f"{len(classification['installed'])} مثبتة، {len(classification['missing'])} غير مثبتة")
 
     def runCode(self):
+        self._startRun()
+
+    def runWithProfiler(self):
+        self._startRun('profile')
+
+    def runWithLineTiming(self):
+        self._startRun('lines')
+
+    def runBenchmark(self):
+        # يقيس التحديد (أسطره كاملة) أو الملف كله دون خلايا "# %% setup"
         page = self.active_editor_page()
         if not page:
             self.updateStatusBar("لا يوجد لسان تبويب نشط لتشغيل الكود.")
             return
+        lines = page.textEdit.toPlainText().split('\n')
+        setup = {line for marker, text in enumerate(lines) if _BENCH_SETUP_RE.match(text)
+                 for line in range(*cell_bounds(lines, marker))}
+        stmt = set(range(len(lines))) - setup
+        cursor = page.textEdit.textCursor()
+        if cursor.hasSelection():
+            doc = page.textEdit.document()
+            first = doc.findBlock(cursor.selectionStart()).blockNumber()
+            last_block = doc.findBlock(cursor.selectionEnd())
+            last = last_block.blockNumber()
+            if last > first and cursor.selectionEnd() == last_block.position():
+                last -= 1
+            stmt = set(range(first, last + 1))
+        # الأسطر الأخرى تُفرغ لتبقى أرقام الأسطر كما في المحرر
+        extract = lambda keep: textwrap.dedent('\n'.join(text if line in keep else '' for line, text in enumerate(lines)))
+        self._startRun('bench', {'setup': extract(setup), 'stmt': extract(stmt), 'min_time': BENCH_MIN_TIME,
+                                 'warmup': BENCH_WARMUP_RUNS, 'repeat': BENCH_REPEATS})
+
+    def _startRun(self, mode=None, bench=None):
+        page = self.active_editor_page()
+        if not page:
+            self.updateStatusBar("لا يوجد لسان تبويب نشط لتشغيل الكود.")
+            return
+        if page.runner.isRunning():
+            self.updateStatusBar("الكود يعمل بالفعل في هذا اللسان، أوقفه أولاً (Shift+F5).")
+            return
 
         code = page.textEdit.toPlainText()
         if not code.strip():
             self.updateStatusBar("لا يوجد كود لتشغيله.")
             return
 
-        if page.outputConsole.isHidden():
+        if page.outputPanel.isHidden():
             self.handleOutputToggle(True)
 
-        page.outputConsole.clear()
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        page.outputConsole.appendPlainText(f"--- بدأ التشغيل: {timestamp} ---")
-        QApplication.processEvents()
+        # ترجمة مسبقة داخل المحرر: خطأ الصياغة لا يستحق تشغيل مفسر
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                for source in ((bench['setup'], bench['stmt']) if bench else (code,)):
+                    compile(source, page.code_filename(), 'exec', dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            page.report_syntax_error(e)
+            where = f" في السطر {e.lineno}" if getattr(e, 'lineno', None) else ""
+            self.updateStatusBar(f"لم يُشغَّل الكود: {type(e).__name__}{where}")
+            return
 
-        temp_file = None
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8', errors='surrogateescape') as tf:
-                tf.write(code)
-                temp_file = tf.name
-                script_dir = os.path.dirname(temp_file)
-
-            self.updateStatusBar(f"جاري تشغيل {os.path.basename(temp_file)}...")
-            QApplication.processEvents()
-
-            startupinfo = None
-            if sys.platform == "win32":
-                 startupinfo = subprocess.STARTUPINFO()
-                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                 startupinfo.wShowWindow = subprocess.SW_HIDE
-
-            process = subprocess.run(
-                [sys.executable or "python", os.path.basename(temp_file)],
-                capture_output=True, text=True, encoding='utf-8',
-                errors='replace', cwd=script_dir, timeout=30,
-                startupinfo=startupinfo
-            )
-
-            if process.stdout:
-                page.outputConsole.appendPlainText("\n--- الإخراج (stdout) ---")
-                page.outputConsole.appendPlainText(process.stdout.strip())
-            if process.stderr:
-                page.outputConsole.appendPlainText("\n--- الأخطاء (stderr) ---")
-                error_format = page.outputConsole.currentCharFormat()
-                error_color = QColor("red") if self.is_dark_mode else QColor("darkred")
-                if error_color.isValid():
-                    error_format.setForeground(error_color)
-                    cursor = page.outputConsole.textCursor()
-                    cursor.movePosition(QTextCursor.MoveOperation.End)
-                    cursor.insertText(process.stderr.strip(), error_format)
-                    default_format = QTextCharFormat()
-                    default_color = page.outputConsole.palette().color(QPalette.ColorRole.Text)
-                    default_format.setForeground(default_color)
-                    page.outputConsole.setCurrentCharFormat(default_format)
-                else:
-                     page.outputConsole.appendPlainText(process.stderr.strip())
-
-            exit_code = process.returncode
-            page.outputConsole.appendPlainText(f"\n--- انتهى (رمز الخروج: {exit_code}) ---")
-            self.updateStatusBar(f"انتهى الكود (رمز الخروج: {exit_code}).")
-
-        except subprocess.TimeoutExpired:
-             page.outputConsole.appendPlainText("\n--- خطأ: انتهت مهلة التشغيل (30 ثانية)! ---")
-             self.updateStatusBar("فشل تشغيل الكود: انتهت المهلة.")
-        except FileNotFoundError:
-             page.outputConsole.appendPlainText(f"\n--- خطأ: لم يتم العثور على مفسر بايثون ({sys.executable or 'python'}) ---")
-             self.updateStatusBar("فشل تشغيل الكود: مفسر بايثون غير موجود.")
-        except Exception as e:
+            page.start_run(code, self.run_timeout, self.interpreter_pool, mode, self.trace_memory, bench)
+        except OSError as e:
             page.outputConsole.appendPlainText(f"\n--- خطأ في تشغيل المحرر للكود ---\n{type(e).__name__}: {e}")
             self.updateStatusBar(f"فشل تشغيل الكود: {type(e).__name__}")
+            return
+        if page.runner.isRunning():
+            warm = " في مفسر مُسخَّن" if page.runner.warm else ""
+            self.updateStatusBar(f"جاري تشغيل الكود{warm}... (Shift+F5 للإيقاف)", 0)
+
+    def toggleRunHistory(self):
+        if self.runHistoryDock.isVisible():
+            self.runHistoryDock.hide()
+            return
+        self.runHistoryPanel.showHistory(self.active_editor_page())
+        self.runHistoryDock.show()
+        self.runHistoryDock.raise_()
+
+    def runHistoryChanged(self, page):
+        if page is self.active_editor_page():
+            self.runHistoryPanel.showHistory(page)
+
+    def showProfile(self, page, profile_path, script):
+        self.updateStatusBar("جاري قراءة نتائج المحلل...")
+        self._runInWorker(lambda result: self._showProfile(page, script, result), load_profile, profile_path)
+
+    def _showProfile(self, page, script, result):
+        if isinstance(result, Exception):
+            self.updateStatusBar(f"لم تُسجَّل بيانات المحلل: {result}")
+            return
+        rows, function_count, total_time = result
+        self.profilePanel.setProfile(page, script, rows, function_count, total_time)
+        self.profileDock.show()
+        self.profileDock.raise_()
+        self.updateStatusBar(f"المحلل: {function_count} دالة في {total_time:.3f} ث")
+
+    def showLineTiming(self, page, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.updateStatusBar(f"لم يُسجَّل توقيت الأسطر: {e}")
+            return
         finally:
-            if temp_file and os.path.exists(temp_file):
-                try: os.remove(temp_file)
-                except OSError as e: print(f"Warning: Could not delete temp file {temp_file}: {e}", file=sys.stderr)
-            page.outputConsole.moveCursor(QTextCursor.MoveOperation.End)
+            os.remove(path)
+        heat = {int(line) - 1: (hits, seconds) for line, (hits, seconds) in data.items()}
+        page.textEdit.setLineHeat(heat)
+        if heat and self.active_editor_page() is page:
+            hottest = max(heat, key=lambda line: heat[line][1])
+            hits, seconds = heat[hottest]
+            self.updateStatusBar(f"أبطأ سطر: {hottest + 1} ({seconds * 1000:.1f} مللي ث في {hits} مرة)", 0)
+
+    def showBenchmark(self, page, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.updateStatusBar(f"لم تُسجَّل نتائج قياس الأداء: {e}")
+            return
+        finally:
+            os.remove(path)
+        loops = data['loops']
+        times = sorted(t / loops for t in data['times'])
+        median = statistics.median(times)
+        mean = statistics.fmean(times)
+        stdev = statistics.stdev(times) if len(times) > 1 else 0.0
+        # القيم الشاذة بقاعدة Tukey: خارج 1.5 × المدى الربيعي
+        outliers = []
+        if len(times) >= 4:
+            q1, _, q3 = statistics.quantiles(times, n=4)
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            outliers = [t for t in times if t < low or t > high]
+        report = [f"--- قياس الأداء: {len(times)} جولات × {loops:,} تكرار (بعد {data['warmup']} جولة إحماء) ---",
+                  f"الأدنى:   {_format_seconds(times[0])} لكل تكرار",
+                  f"الوسيط:   {_format_seconds(median)}",
+                  f"المتوسط:  {_format_seconds(mean)} ± {_format_seconds(stdev)} ({stdev / mean:.1%})",
+                  f"الأقصى:   {_format_seconds(times[-1])}"]
+        if outliers:
+            report.append(f"قيم شاذة: {len(outliers)} من {len(times)} ({'، '.join(_format_seconds(t) for t in outliers)})"
+                          " — قد يكون الجهاز مشغولاً")
+        else:
+            report.append("لا قيم شاذة")
+        page.write_banner('\n'.join(report) + '\n')
+        if self.active_editor_page() is page:
+            self.updateStatusBar(f"قياس الأداء: الوسيط {_format_seconds(median)} لكل تكرار", 0)
+
+    def runCell(self):
+        page = self.active_editor_page()
+        if not page:
+            self.updateStatusBar("لا يوجد لسان تبويب نشط لتشغيل الكود.")
+            return
+        cursor = page.textEdit.textCursor()
+        doc = page.textEdit.document()
+        if cursor.hasSelection():
+            first_line = doc.findBlock(cursor.selectionStart()).blockNumber()
+            code = textwrap.dedent(cursor.selectedText().replace('\u2029', '\n'))
+        else:
+            lines = page.textEdit.toPlainText().split('\n')
+            first_line, end = cell_bounds(lines, cursor.blockNumber())
+            code = '\n'.join(lines[first_line:end])
+        if not code.strip():
+            self.updateStatusBar("الخلية فارغة.")
+            return
+        if page.outputPanel.isHidden():
+            self.handleOutputToggle(True)
+        page.run_cell(code + '\n', first_line)
+
+    def interruptKernel(self):
+        page = self.active_editor_page()
+        if page and page.kernel.interrupt():
+            self.updateStatusBar("تم إرسال مقاطعة إلى النواة.")
+        else:
+            self.updateStatusBar("لا توجد خلية قيد التنفيذ.")
+
+    def restartKernel(self):
+        page = self.active_editor_page()
+        if not page:
+            return
+        page.kernel.restart()
+        page.update_run_controls()
+        page.write_banner("--- أُعيد تشغيل النواة ---\n")
+        self.updateStatusBar("أُعيد تشغيل النواة، وفُقدت المتغيرات السابقة.")
+
+    def stopCode(self):
+        page = self.active_editor_page()
+        if page and page.runner.isRunning():
+            page.runner.stop()
+            self.updateStatusBar("جاري إيقاف الكود...")
+        else:
+            self.updateStatusBar("لا يوجد كود قيد التشغيل.")
+
+    def configureWarmInterpreters(self):
+        pool = self.interpreter_pool
+        text, ok = QInputDialog.getText(self, "تسخين المفسر",
+                                        "وحدات تُستورد مسبقاً في مفسر جاهز للتشغيل التالي\n"
+                                        "(مفصولة بفواصل، فارغ = تعطيل):",
+                                        text=", ".join(pool.preimports))
+        if not ok:
+            return
+        modules = [name.strip() for name in text.replace(' ', ',').split(',') if name.strip()]
+        pool.configure(modules)
+        if pool.isEnabled():
+            self.updateStatusBar(f"مفسر مُسخَّن جاهز مع: {', '.join(modules)}")
+        else:
+            self.updateStatusBar("تم تعطيل المفسر المُسخَّن.")
+
+    def setRunTimeout(self):
+        seconds, ok = QInputDialog.getInt(self, "مهلة التشغيل", "أقصى مدة للتشغيل بالثواني (0 = بلا مهلة):",
+                                          int(self.run_timeout), 0, 7 * 24 * 3600)
+        if ok:
+            self.run_timeout = seconds
+            self.updateStatusBar(f"مهلة التشغيل: {seconds} ث" if seconds else "مهلة التشغيل: بلا مهلة")
 
     def showTextContextMenu(self, position: QPoint):
         page = self.active_editor_page()
@@ -1518,6 +4856,12 @@ greet("User")
 
         menu.addSeparator()
 
+        spill_path = page.outputConsole.spillPath()
+        spill_action = QAction(f"فتح الأسطر الأقدم ({page.outputConsole.spilled_lines} سطر)", self)
+        spill_action.triggered.connect(lambda: self.openPath(spill_path))
+        spill_action.setEnabled(spill_path is not None)
+        menu.addAction(spill_action)
+
         clear_action = QAction("مسح الإخراج", self)
         clear_action.triggered.connect(page.outputConsole.clear)
         clear_action.setEnabled(has_content)
@@ -1530,6 +4874,7 @@ greet("User")
             if not self.close_tab_and_prompt(0):
                 event.ignore()
                 return
+        self.interpreter_pool.shutdown()
         event.accept()
 
     def close_tab_and_prompt(self, index):
@@ -1549,12 +4894,14 @@ greet("User")
             elif reply == QMessageBox.StandardButton.Cancel:
                 return False
         
+        self._teardownPage(page)
         self.tab_widget.removeTab(index)
         return True
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(_shutdown_worker_pool)
     mainWin = AdvancedEditorTab()
     mainWin.show()
     sys.exit(app.exec())
\ No newline at end of file
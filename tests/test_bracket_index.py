@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from editpython import BracketIndex, tokenize_line
+
+
+def make_index(text):
+    # BracketIndex يحتاج من المستند إشارة contentsChange فقط
+    index = BracketIndex(SimpleNamespace(contentsChange=SimpleNamespace(connect=lambda slot: None)))
+    position = 0
+    state = 0
+    for line in text.split('\n'):
+        brackets = []
+        _, state = tokenize_line(line, state, brackets)
+        index.setBlockBrackets(position, position + len(line) + 1, brackets)
+        position += len(line) + 1
+    return index
+
+
+def test_matches_across_lines_in_both_directions():
+    text = "f(a, [b,\n  c], {'k': (d)})"
+    index = make_index(text)
+    assert index.findMatch(1, '(') == len(text) - 1
+    assert index.findMatch(len(text) - 1, ')') == 1
+    assert index.findMatch(5, '[') == text.index(']')
+    assert index.findMatch(text.index('}'), '}') == text.index('{')
+
+
+def test_brackets_in_strings_and_comments_are_ignored():
+    text = "x = ('(', \"]\")  # )"
+    index = make_index(text)
+    assert index.findMatch(4, '(') == text.index(')', 10)
+
+
+def test_unmatched_and_non_bracket_positions():
+    index = make_index("(()")
+    assert index.findMatch(0, '(') is None
+    assert index.findMatch(1, '(') == 2
+    assert index.findMatch(1, 'x') is None
+    assert index.findMatch(5, ')') is None
+
+
+def test_edit_shifts_later_brackets():
+    text = "(a)\n[b]"
+    index = make_index(text)
+    # إدراج ثلاثة أحرف في السطر الأول
+    index._onContentsChange(1, 0, 3)
+    brackets = []
+    tokenize_line("(xyza)", 0, brackets)
+    index.setBlockBrackets(0, 7, brackets)
+    assert index.findMatch(0, '(') == 5
+    assert index.findMatch(7, '[') == 9
+
+
+def test_matching_spans_many_chunks():
+    text = "(" + "[]" * 2000 + ")"
+    index = make_index(text)
+    assert index.findMatch(0, '(') == len(text) - 1
+    assert index.findMatch(len(text) - 1, ')') == 0
+    assert index.findMatch(2001, '[') == 2002
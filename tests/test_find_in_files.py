@@ -0,0 +1,46 @@
+import os
+
+from editpython import iter_source_files
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+
+
+def test_walk_skips_ignored_directories(tmp_path):
+    root = str(tmp_path)
+    touch(os.path.join(root, 'app', 'main.py'))
+    touch(os.path.join(root, 'app', '__pycache__', 'main.cpython-311.pyc'))
+    touch(os.path.join(root, 'venv', 'lib', 'site.py'))
+    touch(os.path.join(root, '.git', 'config'))
+    found = sorted(os.path.relpath(path, root) for path in iter_source_files(root))
+    assert found == [os.path.join('app', 'main.py')]
+
+
+def test_skipped_paths_are_not_yielded(tmp_path):
+    # الملفات المفتوحة في الألسنة تُبحث من نصها في المحرر لا من القرص
+    root = str(tmp_path)
+    touch(os.path.join(root, 'a.py'))
+    touch(os.path.join(root, 'b.py'))
+    skip = {os.path.normcase(os.path.join(root, 'a.py'))}
+    assert list(iter_source_files(root, skip)) == [os.path.join(root, 'b.py')]
+
+
+def test_virtual_environments_are_skipped_by_name_and_by_pyvenv_cfg(tmp_path):
+    root = str(tmp_path)
+    touch(os.path.join(root, 'app', 'main.py'))
+    touch(os.path.join(root, 'env', 'lib', 'site.py'))
+    touch(os.path.join(root, 'py312', 'pyvenv.cfg'))
+    touch(os.path.join(root, 'py312', 'lib', 'python3.12', 'os.py'))
+    touch(os.path.join(root, '.git', 'config'))
+    found = sorted(os.path.relpath(path, root) for path in iter_source_files(root))
+    assert found == [os.path.join('app', 'main.py')]
+
+
+def test_root_that_is_itself_a_virtual_environment_is_searched(tmp_path):
+    root = str(tmp_path)
+    touch(os.path.join(root, 'pyvenv.cfg'))
+    touch(os.path.join(root, 'lib', 'tool.py'))
+    found = sorted(os.path.relpath(path, root) for path in iter_source_files(root))
+    assert found == [os.path.join('lib', 'tool.py'), 'pyvenv.cfg']
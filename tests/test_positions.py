@@ -0,0 +1,86 @@
+import bisect
+from array import array
+import random
+
+from editpython import _BracketSequence, _ChunkedPositions, POSITION_CHUNK_SIZE
+
+
+def contents(index):
+    return [index.item(i) for i in range(len(index))]
+
+
+def model_splice(model, start, end, delta, positions=(), values=()):
+    kept = [(p, v) for p, v in model if p < start] + list(zip(positions, values))
+    return kept + [(p + delta, v) for p, v in model if p >= end]
+
+
+def test_empty():
+    index = _ChunkedPositions()
+    assert len(index) == 0
+    assert index.indexAtOrAfter(10) == 0
+    assert not index.hasRange(0, 100)
+    index.splice(0, 10, 5)
+    assert len(index) == 0
+
+
+def test_append_fills_chunks():
+    index = _ChunkedPositions()
+    count = POSITION_CHUNK_SIZE * 2 + 3
+    index.splice(0, 0, 0, list(range(0, 2 * count, 2)), [1] * count)
+    assert len(index) == count
+    assert [len(chunk.positions) for chunk in index.chunks] == [POSITION_CHUNK_SIZE, POSITION_CHUNK_SIZE, 3]
+    assert index.item(count - 1) == (2 * (count - 1), 1)
+    assert index.indexAtOrAfter(5) == 3
+    assert index.indexAtOrAfter(2 * count) == count
+
+
+def test_delete_range_and_shift_later_positions():
+    index = _ChunkedPositions()
+    index.splice(0, 0, 0, [1, 5, 9, 13], [10, 20, 30, 40])
+    index.splice(4, 10, -6)
+    assert contents(index) == [(1, 10), (7, 40)]
+    assert index.hasRange(7, 8)
+    assert not index.hasRange(2, 7)
+
+
+def test_shift_only_moves_positions_at_or_after_start():
+    index = _ChunkedPositions()
+    index.splice(0, 0, 0, [0, 10, 20], [1, 2, 3])
+    index.splice(15, 15, 100)
+    assert contents(index) == [(0, 1), (10, 2), (120, 3)]
+
+
+def test_random_edits_match_a_plain_list():
+    rng = random.Random(1234)
+    index = _ChunkedPositions()
+    initial = sorted(rng.sample(range(20000), 3000))
+    index.splice(0, 0, 0, initial, list(range(len(initial))))
+    model = list(zip(initial, range(len(initial))))
+    for step in range(500):
+        start = rng.randrange(0, 21000)
+        end = start + rng.choice((0, 0, 1, 50, 400))
+        delta = rng.randrange(-(end - start), 60)
+        # المواضع الجديدة داخل المقطع المستبدل [start, end + delta)
+        room = end - start + delta
+        new = sorted(rng.sample(range(start, start + room), min(room, rng.randrange(0, 8)))) if room > 0 else []
+        values = [-step] * len(new)
+        index.splice(start, end, delta, new, values)
+        model = model_splice(model, start, end, delta, new, values)
+        assert len(index) == len(model)
+        probe = rng.randrange(0, 21000)
+        assert index.indexAtOrAfter(probe) == bisect.bisect_left([p for p, _ in model], probe)
+    assert contents(index) == model
+
+
+def test_chunks_are_compact_arrays():
+    index = _ChunkedPositions()
+    index.splice(0, 0, 0, [1, 5, 9], [10, 20, 30])
+    index.splice(4, 6, 2, [4], [7])
+    for chunk in index.chunks:
+        assert isinstance(chunk.positions, array) and chunk.positions.typecode == 'q'
+        assert isinstance(chunk.values, array) and chunk.values.typecode == 'q'
+    assert contents(index) == [(1, 10), (4, 7), (11, 30)]
+    brackets = _BracketSequence()
+    brackets.splice(0, 0, 0, [0, 3], [1, -1])
+    assert brackets.chunks[0].values.typecode == 'b'
+    assert brackets.match(0) == 3
@@ -0,0 +1,168 @@
+import random
+import time
+
+from PyQt6.QtGui import QTextCursor, QTextDocument
+
+from editpython import (
+    SEARCH_KILL_GRACE, SearchIndex, _document_text, _find_all, compile_search_pattern, find_all_within,
+)
+
+
+def expected(pattern, text):
+    return [m.span() for m in pattern.finditer(text) if m.end() > m.start()]
+
+
+def found(positions, lengths):
+    return [(start, start + length) for start, length in zip(positions, lengths)]
+
+
+def test_plain_queries_are_escaped_and_regex_queries_are_not():
+    assert compile_search_pattern("a.b").search("axb") is None
+    assert compile_search_pattern("a.b", regex=True).search("axb")
+    assert compile_search_pattern("^x", regex=True).findall("x\nx") == ["x", "x"]
+
+
+def test_case_and_whole_word_options():
+    assert compile_search_pattern("Self").search("self")
+    assert compile_search_pattern("Self", case_sensitive=True).search("self") is None
+    pattern = compile_search_pattern("sel", whole_word=True)
+    assert pattern.search("self") is None
+    assert pattern.search("x = sel + 1")
+
+
+def test_find_all_reports_utf16_positions_and_lengths():
+    pattern = compile_search_pattern("ab")
+    assert _find_all(pattern, "ab ab") == ([0, 3], [2, 2], True, 5)
+    assert _find_all(pattern, "\U0001F600ab", 10) == ([12], [2], True, 3)
+
+
+def test_single_line_results_match_finditer():
+    text = "".join(f"value_{i} = {i} # value\n" for i in range(3000))
+    pattern = compile_search_pattern("value")
+    positions, lengths, complete, _ = _find_all(pattern, text)
+    assert complete
+    assert found(positions, lengths) == expected(pattern, text)
+
+
+MULTILINE_CASES = [
+    (r"a\s+b", "x a\nb y\n" * 2000),
+    (r"\n\n", "line\n\n" * 1000),
+    (r"a\s+b", "a\n\n\n   b\n" * 1500),
+    (r"def\s+\w+\(", "def\n    f(x):\n    pass\n" * 1200),
+]
+
+
+def test_multiline_matches_are_not_cut_at_slice_boundaries():
+    for query, text in MULTILINE_CASES:
+        pattern = compile_search_pattern(query, regex=True)
+        positions, lengths, complete, resume = _find_all(pattern, text)
+        assert complete and resume == len(text)
+        assert found(positions, lengths) == expected(pattern, text)
+        # نفس العدد الذي يستبدله replaceAll
+        assert len(positions) == pattern.subn("", text)[1]
+
+
+def test_chunks_resume_from_the_unfinished_tail():
+    # كما يقطع SearchIndex البحث في الخلفية إلى دفعات من أسطر كاملة
+    pattern = compile_search_pattern(r"a\s+b", regex=True)
+    text = "a\n\nb " * 3000
+    start, spans = 0, []
+    while start < len(text):
+        end = text.find("\n", start + 1000)
+        end = len(text) if end < 0 else end + 1
+        positions, lengths, complete, resume = _find_all(pattern, text[start:end], start,
+                                                         final=end == len(text))
+        assert complete and resume > 0
+        spans.extend(found(positions, lengths))
+        start += resume
+    assert spans == expected(pattern, text)
+
+
+def test_match_cap_stops_the_scan():
+    positions, _, complete, _ = _find_all(compile_search_pattern("x"), "x\n" * 1000, limit=10)
+    assert len(positions) == 10 and not complete
+
+
+def test_deadline_stops_between_slices():
+    text = "a" * 20 + "\n"
+    started = time.perf_counter()
+    _, _, complete, _ = _find_all(compile_search_pattern(r"(a+)+b", regex=True), text * 200, deadline=started + 0.05)
+    assert not complete
+    assert time.perf_counter() - started < 2
+
+
+def test_search_index_follows_edits():
+    rng = random.Random(11)
+    pattern = compile_search_pattern("ab")
+    document = QTextDocument()
+    document.setPlainText("ab\nxab\n\n" * 400)
+    index = SearchIndex(document)
+    index.setPattern(pattern)
+    cursor = QTextCursor(document)
+    for _ in range(300):
+        text = _document_text(document)
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(4))
+        inserted = rng.choice(["", "a", "b", "ab", "\n", "a\n", "\nb"])
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(inserted)
+        # دون QGuiApplication لا تخطيط للمستند فلا تُرسل contentsChange
+        index._onContentsChange(start, end - start, len(inserted))
+        text = _document_text(document)
+        assert [index.match(i) for i in range(len(index))] == expected(pattern, text)
+
+
+def test_search_index_follows_edits_across_lines():
+    rng = random.Random(11)
+    pattern = compile_search_pattern(r"a\s+b", regex=True)
+    document = QTextDocument()
+    document.setPlainText("a\nb\n\n" * 400)
+    index = SearchIndex(document)
+    index.setPattern(pattern)
+    cursor = QTextCursor(document)
+    for _ in range(300):
+        text = _document_text(document)
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(4))
+        inserted = rng.choice(["", "a", "b", " ", "\n", "a\n", "\nb"])
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(inserted)
+        # دون QGuiApplication لا تخطيط للمستند فلا تُرسل contentsChange
+        index._onContentsChange(start, end - start, len(inserted))
+        text = _document_text(document)
+        assert [index.match(i) for i in range(len(index))] == expected(pattern, text)
+
+
+SLOW_TEXT = ("a" * 28 + "!\n") * 3
+
+
+def test_slow_regex_is_stopped_at_the_budget():
+    pattern = compile_search_pattern(r"(a+)+$", regex=True)
+    # العملية المعزولة تبدأ أولاً فلا يُحسب زمن بدئها من الحد
+    find_all_within(pattern, "a\n", budget=None)
+    started = time.perf_counter()
+    positions, _, complete, _ = find_all_within(pattern, SLOW_TEXT, budget=0.3)
+    assert positions == [] and not complete
+    assert time.perf_counter() - started < 0.3 + SEARCH_KILL_GRACE + 0.5
+    # العملية المقتولة تُستبدل للمهمة التالية
+    assert find_all_within(pattern, "aa\n", budget=None)[:3] == ([0], [2], True)
+
+
+def test_search_index_stops_slow_regex_on_edits():
+    pattern = compile_search_pattern(r"(a+)+$", regex=True)
+    find_all_within(pattern, "a\n", budget=None)
+    document = QTextDocument()
+    document.setPlainText(SLOW_TEXT)
+    index = SearchIndex(document)
+    started = time.perf_counter()
+    index.setPattern(pattern, budget=0.3)
+    assert not index.complete
+    cursor = QTextCursor(document)
+    for _ in range(3):
+        cursor.insertText("a")
+        index._onContentsChange(cursor.position() - 1, 0, 1)
+    # النمط تجاوز حده فلا يُعاد مسحه مع كل تعديل
+    assert time.perf_counter() - started < 0.3 + SEARCH_KILL_GRACE + 0.5
+    assert len(index) == 0
@@ -0,0 +1,71 @@
+import random
+
+from editpython import text_difference, toggle_comment_lines, indent_lines, dedent_lines
+
+
+def apply(old, new):
+    start, old_end, new_end = text_difference(old, new)
+    assert old[:start] + new[start:new_end] + old[old_end:] == new
+    return start, old_end, new_end
+
+
+def test_identical_and_empty_texts():
+    assert text_difference("", "") == (0, 0, 0)
+    assert text_difference("abc", "abc") == (3, 3, 3)
+
+
+def test_from_and_to_empty_is_a_whole_document_edit():
+    assert apply("", "hello") == (0, 0, 5)
+    assert apply("hello", "") == (0, 5, 0)
+
+
+def test_whole_document_replacement():
+    assert apply("abc", "xyz") == (0, 3, 3)
+
+
+def test_prefix_and_suffix_do_not_overlap_on_repeated_text():
+    assert apply("aa", "aaa") == (2, 2, 3)
+    assert apply("aaa", "aa") == (2, 3, 2)
+    assert apply("abab", "ab") == (2, 4, 2)
+
+
+def test_middle_edit_keeps_shared_lines():
+    old = "a = 1\nb = 2\nc = 3\n"
+    new = "a = 1\n# b = 2\nc = 3\n"
+    assert apply(old, new) == (6, 6, 8)
+
+
+def test_astral_characters():
+    assert apply("x\U0001F600y", "x\U0001F601y") == (1, 2, 2)
+
+
+def test_random_edits_are_minimal_and_reproduce_the_new_text():
+    rng = random.Random(7)
+    for _ in range(300):
+        old = ''.join(rng.choice("ab\n") for _ in range(rng.randrange(0, 40)))
+        start = rng.randrange(0, len(old) + 1)
+        end = rng.randrange(start, len(old) + 1)
+        new = old[:start] + ''.join(rng.choice("ab\n") for _ in range(rng.randrange(0, 5))) + old[end:]
+        s, old_end, new_end = apply(old, new)
+        # المقطع المختلف لا يبدأ ولا ينتهي بحرف مشترك
+        if s < old_end and s < new_end:
+            assert old[s] != new[s]
+            assert old[old_end - 1] != new[new_end - 1]
+
+
+def test_toggle_comment_adds_at_the_smallest_indent_and_removes_again():
+    lines = ["    if x:", "        y()", "", "    z()"]
+    commented = toggle_comment_lines(lines)
+    assert commented == ["    # if x:", "    #     y()", "", "    # z()"]
+    assert toggle_comment_lines(commented) == lines
+
+
+def test_toggle_comment_on_mixed_lines_comments_all():
+    assert toggle_comment_lines(["# a", "b"]) == ["# # a", "# b"]
+    assert toggle_comment_lines(["#a"]) == ["a"]
+    assert toggle_comment_lines(["", "  "]) == ["", "  "]
+
+
+def test_indent_and_dedent():
+    assert indent_lines(["a", "", "  b"]) == ["    a", "", "      b"]
+    assert dedent_lines(["      a", "  b", "\tc", "d"]) == ["  a", "b", "c", "d"]
@@ -0,0 +1,103 @@
+import editpython as ep
+from editpython import tokenize_line, _DEPTH_SHIFT, _FSTRING_FLAG, MAX_BRACKET_DEPTH
+
+
+def test_one_pass_classifies_keywords_names_numbers_strings_and_comments():
+    spans, state = tokenize_line("if self.x == 10: print('a') # done", 0)
+    assert spans == [(0, 2, 'keyword'), (3, 4, 'self'), (13, 2, 'number'), (23, 3, 'string'), (28, 6, 'comment')]
+    assert state == 0
+
+
+def test_def_and_class_names_are_definitions():
+    assert tokenize_line("def f(): pass")[0] == [(0, 3, 'keyword'), (4, 1, 'definition'), (9, 4, 'keyword')]
+    assert tokenize_line("class C:")[0] == [(0, 5, 'keyword'), (6, 1, 'definition')]
+
+
+def test_open_brackets_are_packed_into_the_depth_bits():
+    brackets = []
+    spans, state = tokenize_line("x = (1, [2,", 0, brackets)
+    assert spans == [(5, 1, 'number'), (9, 1, 'number')]
+    assert state == 2 << _DEPTH_SHIFT
+    assert brackets == [(4, '('), (8, '[')]
+
+
+def test_closing_brackets_reduce_depth_and_never_go_negative():
+    _, state = tokenize_line("])", 2 << _DEPTH_SHIFT)
+    assert state == 0
+    _, state = tokenize_line(")))", 0)
+    assert state == 0
+
+
+def test_depth_is_capped():
+    _, state = tokenize_line("(" * (MAX_BRACKET_DEPTH + 45))
+    assert state == MAX_BRACKET_DEPTH << _DEPTH_SHIFT
+
+
+def test_def_line_resyncs_an_unclosed_bracket_depth():
+    spans, state = tokenize_line("def f(): pass", 3 << _DEPTH_SHIFT)
+    assert spans == [(0, 3, 'keyword'), (4, 1, 'definition'), (9, 4, 'keyword')]
+    assert state == 0
+
+
+def test_open_triple_quote_keeps_quote_kind_fstring_flag_and_depth():
+    spans, state = tokenize_line("s = (f'''{a", 0)
+    assert spans == [(5, 6, 'string')]
+    assert state & ep._QUOTE_MASK == ep._TRIPLE_STATES["'''"]
+    assert state & _FSTRING_FLAG
+    assert state >> _DEPTH_SHIFT == 1
+
+
+def test_line_inside_triple_quote_is_all_string():
+    state = ep._TRIPLE_STATES['"""']
+    assert tokenize_line("still (inside", state) == ([(0, 13, 'string')], state)
+    assert tokenize_line("", state) == ([], state)
+
+
+def test_closing_a_triple_quote_and_opening_another_drops_the_fstring_flag():
+    state = _FSTRING_FLAG | ep._TRIPLE_STATES["'''"] | (1 << _DEPTH_SHIFT)
+    spans, state = tokenize_line("b}''' + \"\"\"", state)
+    assert spans == [(0, 5, 'string'), (8, 3, 'string')]
+    assert state == ep._TRIPLE_STATES['"""'] | (1 << _DEPTH_SHIFT)
+
+
+def test_fstring_with_nested_quotes_is_one_string():
+    brackets = []
+    spans, state = tokenize_line("y = f\"{d['k']}\" # (", 0, brackets)
+    assert spans == [(4, 11, 'string'), (16, 3, 'comment')]
+    assert state == 0
+    assert brackets == []
+
+
+def test_spans_and_brackets_use_utf16_offsets_after_astral_characters():
+    brackets = []
+    spans, _ = tokenize_line("\U0001F600 = ('\U0001F600', 1)", 0, brackets)
+    # كل إيموجي وحدتان في UTF-16
+    assert spans == [(6, 4, 'string'), (12, 1, 'number')]
+    assert brackets == [(5, '('), (13, ')')]
+
+
+def test_bmp_only_text_is_not_remapped():
+    assert tokenize_line("س = 'ص' # 1") == ([(4, 3, 'string'), (8, 3, 'comment')], 0)
+
+
+def test_utf16_offset():
+    assert ep._utf16_offset("abc", 2) == 2
+    assert ep._utf16_offset("a\U0001F600b", 1) == 1
+    assert ep._utf16_offset("a\U0001F600b", 2) == 3
+    assert ep._utf16_offset("\U0001F600\U0001F600", 2) == 4
+
+
+def test_tokenize_document_matches_line_by_line_tokenizing():
+    lines = ["def f(x):", "    s = '''doc", "    (more'''", "    return [x,", "        1]"]
+    offsets, flat, states, bracket_offsets, bracket_flat = ep.tokenize_document('\n'.join(lines))
+    state = 0
+    for number, line in enumerate(lines):
+        brackets = []
+        spans, state = tokenize_line(line, state, brackets)
+        got = [(flat[i], flat[i + 1], ep._TOKEN_KINDS[flat[i + 2]])
+               for i in range(3 * offsets[number], 3 * offsets[number + 1], 3)]
+        assert got == spans
+        assert states[number] == state
+        got_brackets = [(bracket_flat[i], chr(bracket_flat[i + 1]))
+                        for i in range(2 * bracket_offsets[number], 2 * bracket_offsets[number + 1], 2)]
+        assert got_brackets == brackets